@@ -0,0 +1,115 @@
+"""
+Micro-batching of concurrent single-row predictions.
+
+Every model call has a fixed cost that has little to do with the number of
+rows: sklearn's input validation, setting up the Random Forest's traversal
+over its trees, a round trip to the quantum process pool. Under load many
+/api/predict calls for the same model are in flight at once, and each one
+pays that cost for a single row.
+
+A MicroBatcher collects the rows requested for one model. It sends them to
+app.scheduler as one batch, either config.MICROBATCH_MAX_WAIT_MS after the
+first row arrives or as soon as config.MICROBATCH_MAX_ROWS rows are
+waiting. When the batch is scored, each caller gets its own row back:
+
+    decision, probs = await batcher.predict(X)  # X: (1, n_features)
+
+A batch is one scheduler job, so the per-model concurrency and queue limits
+count batches, and a full queue fails every row of the batch with
+Overloaded. Batch sizes go to the microbatch_rows histogram.
+
+Batchers live on the event loop: predict() is only called from async
+handlers.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app import config
+from app.models.decision import decision_names, probabilities_dict
+from app.scheduler import SCHEDULER
+from app.telemetry import METRICS, SIZE_BUCKETS
+
+METRICS.describe("microbatch_rows", "Rows scored per micro-batch, by model.", buckets=SIZE_BUCKETS)
+
+
+class MicroBatcher:
+    """
+    Coalesces rows for one model into batches scored by fn(*args, X), which
+    returns (decision codes, probabilities) like registry.score_batch.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        fn: Callable,
+        *args,
+        max_rows: int = config.MICROBATCH_MAX_ROWS,
+        max_wait_ms: float = config.MICROBATCH_MAX_WAIT_MS,
+    ):
+        self.model_name = model_name
+        self.fn = fn
+        self.args = args
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self._rows: List[np.ndarray] = []
+        self._waiters: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def predict(self, X: np.ndarray) -> Tuple[str, Dict[str, float]]:
+        """
+        (decision, probabilities) for the single row X, scored with whatever
+        other rows arrive for this model in the meantime.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._rows.append(X)
+        self._waiters.append(waiter)
+
+        if len(self._rows) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await waiter
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, waiters = self._rows, self._waiters
+        self._rows, self._waiters = [], []
+        if not rows:
+            return
+
+        METRICS.observe("microbatch_rows", len(rows), model=self.model_name)
+        try:
+            future = SCHEDULER.submit(self.model_name, self.fn, *self.args, np.vstack(rows))
+        except Exception as e:  # Overloaded, or the pool could not start
+            _fail(waiters, e)
+            return
+
+        task = asyncio.get_running_loop().create_task(self._deliver(asyncio.wrap_future(future), waiters))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, result: asyncio.Future, waiters: List[asyncio.Future]) -> None:
+        try:
+            codes, P = await result
+        except (Exception, asyncio.CancelledError) as e:  # CancelledError: scheduler shut down
+            _fail(waiters, e)
+            return
+
+        names = decision_names(codes)
+        for i, waiter in enumerate(waiters):
+            if not waiter.done():  # its request may have been cancelled
+                waiter.set_result((str(names[i]), probabilities_dict(P[i])))
+
+
+def _fail(waiters: List[asyncio.Future], error: BaseException) -> None:
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_exception(error)
@@ -0,0 +1,174 @@
+"""
+Per-ticker / per-month breakdown of the evaluation metrics.
+
+evaluate_models.py counts, for every model, how often each (true label,
+predicted decision) pair occurs in every (ticker, month) cell, plus how
+often the model agrees with Random Forest there. Every breakdown (accuracy,
+agreement, confusion matrix, label distribution; per ticker, per month, for
+any ticker subset or date range) is a sum over slices of those arrays:
+
+    models/metrics_breakdown.npz
+      models          (M,)              model names
+      tickers         (T,)              ticker symbols
+      months          (P,)              "YYYY-MM", ascending
+      confusion       (M, T, P, 3, 3)   int32 counts, [true, predicted] in DECISIONS order
+      agree_with_rf   (M, T, P)         int32 rows where the model matches RF
+      n_rows          (T, P)            int32 rows per cell (labeled or not)
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.decision import DECISIONS
+from app.models.quantum import MODELS_DIR
+
+BREAKDOWN_PATH = MODELS_DIR / "metrics_breakdown.npz"
+N_CLASSES = len(DECISIONS)
+
+_CACHED: Dict[str, Any] = {}
+
+
+def month_codes(dates: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    ISO dates -> (sorted "YYYY-MM" keys, int32 month code per date).
+    """
+    months, codes = np.unique(np.asarray([d[:7] for d in dates]), return_inverse=True)
+    return months.tolist(), codes.astype(np.int32)
+
+
+def grouped_counts(
+    ticker_codes: np.ndarray,
+    month_codes: np.ndarray,
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    y_rf: np.ndarray,
+    n_tickers: int,
+    n_months: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One bincount per statistic over the flattened (ticker, month[, true,
+    pred]) cell id of every row. Rows without a ticker/month (-1) are
+    ignored; unlabeled rows (y_true == -1) only count towards n_rows and
+    agreement.
+
+    Returns (confusion (T, P, 3, 3), agree_with_rf (T, P), n_rows (T, P)).
+    """
+    n_cells = n_tickers * n_months
+    mapped = (ticker_codes >= 0) & (month_codes >= 0)
+    cell = ticker_codes[mapped].astype(np.int64) * n_months + month_codes[mapped]
+    y_true, y_pred, y_rf = y_true[mapped], y_pred[mapped], y_rf[mapped]
+
+    labeled = y_true >= 0
+    conf_id = (cell[labeled] * N_CLASSES + y_true[labeled]) * N_CLASSES + y_pred[labeled]
+    confusion = np.bincount(conf_id, minlength=n_cells * N_CLASSES * N_CLASSES)
+    agree = np.bincount(cell[y_pred == y_rf], minlength=n_cells)
+    n_rows = np.bincount(cell, minlength=n_cells)
+
+    return (
+        confusion.reshape(n_tickers, n_months, N_CLASSES, N_CLASSES),
+        agree.reshape(n_tickers, n_months),
+        n_rows.reshape(n_tickers, n_months),
+    )
+
+
+def save_breakdown(
+    models: List[str],
+    tickers: List[str],
+    months: List[str],
+    confusion: np.ndarray,
+    agree_with_rf: np.ndarray,
+    n_rows: np.ndarray,
+    path: Path = BREAKDOWN_PATH,
+) -> None:
+    with path.open("wb") as f:
+        np.savez_compressed(
+            f,
+            models=np.asarray(models),
+            tickers=np.asarray(tickers),
+            months=np.asarray(months),
+            confusion=confusion.astype(np.int32),
+            agree_with_rf=agree_with_rf.astype(np.int32),
+            n_rows=n_rows.astype(np.int32),
+        )
+    print(f"Saved metrics breakdown to {path}")
+
+
+def load_breakdown(path: Path = BREAKDOWN_PATH) -> Optional[Dict[str, np.ndarray]]:
+    """
+    The breakdown arrays, or None if evaluate_models.py has not written them.
+    Re-read only when the file changes.
+    """
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    if _CACHED.get("mtime") != mtime:
+        with np.load(path) as npz:
+            _CACHED["data"] = {k: npz[k] for k in npz.files}
+        _CACHED["mtime"] = mtime
+    return _CACHED["data"]
+
+
+def summarize(
+    data: Dict[str, np.ndarray],
+    by: str,
+    tickers: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    model_names: Optional[List[str]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Per-ticker (by="ticker") or per-month (by="month") metrics for each model,
+    restricted to `tickers` and to the months overlapping
+    [start_date, end_date]. Groups without rows are left out.
+    """
+    all_tickers = data["tickers"].tolist()
+    months = data["months"]
+
+    t_sel = np.arange(len(all_tickers))
+    if tickers is not None:
+        pos = {t: i for i, t in enumerate(all_tickers)}
+        t_sel = np.asarray([pos[t] for t in tickers if t in pos], dtype=np.int64)
+
+    m_mask = np.ones(len(months), dtype=bool)
+    if start_date is not None:
+        m_mask &= months >= start_date[:7]
+    if end_date is not None:
+        m_mask &= months <= end_date[:7]
+    m_sel = np.flatnonzero(m_mask)
+
+    # Collapse the other axis: by ticker sums over months and vice versa
+    axis = 1 if by == "ticker" else 0
+    keys = [all_tickers[i] for i in t_sel] if by == "ticker" else months[m_sel].tolist()
+
+    n_rows = data["n_rows"][np.ix_(t_sel, m_sel)].sum(axis=axis)
+
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    for j, name in enumerate(data["models"].tolist()):
+        if model_names is not None and name not in model_names:
+            continue
+
+        confusion = data["confusion"][j][np.ix_(t_sel, m_sel)].sum(axis=axis)  # (G, 3, 3)
+        agree = data["agree_with_rf"][j][np.ix_(t_sel, m_sel)].sum(axis=axis)  # (G,)
+
+        labeled = confusion.sum(axis=(1, 2))
+        correct = np.trace(confusion, axis1=1, axis2=2)
+        label_dist = confusion.sum(axis=2)  # (G, 3) true-label counts
+
+        groups = []
+        for g in np.flatnonzero(n_rows > 0):
+            groups.append(
+                {
+                    "key": keys[g],
+                    "n_rows": int(n_rows[g]),
+                    "accuracy_vs_true": float(correct[g] / labeled[g]) if labeled[g] else None,
+                    "agreement_with_rf": float(agree[g] / n_rows[g]),
+                    "confusion_matrix": confusion[g].tolist(),
+                    "label_distribution": dict(zip(DECISIONS, label_dist[g].tolist())),
+                }
+            )
+        result[name] = groups
+    return result
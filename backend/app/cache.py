@@ -0,0 +1,90 @@
+"""
+In-process LRU cache for /api/predict.
+
+The dataset is static (2015-2020), so the same (model, ticker, date) always
+gives the same answer until the model is retrained. Entries are keyed on
+
+    (model_name, ticker, date, artifact fingerprint)
+
+where the fingerprint is the size + mtime of the model's files on disk:
+retraining rewrites them, so old entries simply stop being hit and age out.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+from app import config
+
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+def artifact_fingerprint(paths: Sequence[Path]) -> Fingerprint:
+    """
+    (name, size, mtime_ns) of every artifact that exists. One stat() per
+    file, cheap enough to do on every request.
+    """
+    parts = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        parts.append((path.name, st.st_size, st.st_mtime_ns))
+    return tuple(parts)
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU map with hit / miss / eviction counters.
+    Once max_entries is reached, each insert evicts the least recently used
+    entry.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+PREDICTION_CACHE = LRUCache(config.PREDICTION_CACHE_SIZE)
@@ -1,3 +1,4 @@
+import os
 from typing import List
 
 # Universe of tickers will add back and expand to 200 later
@@ -199,6 +200,43 @@ LABEL_HORIZON_DAYS = 2      # look-ahead window
 BUY_THRESHOLD = 0.01          # +1%
 SELL_THRESHOLD = -0.01        # -1%
 
+# Decision rule for classical models: only call HOLD when the model is at
+# least this confident in it (see app.models.decision)
+HOLD_THRESHOLD = 0.6
+
+# Max (model, ticker, date) entries kept by the /api/predict LRU cache
+# (app.cache); a few hundred bytes each. 0 disables caching.
+PREDICTION_CACHE_SIZE = 50_000
+
+# Load the data and every model in a background thread when the API starts
+# (app.main.prewarm) instead of on the first request that needs them; the
+# worker reports ready once it finishes. Set PREWARM=1 in the environment.
+PREWARM = os.environ.get("PREWARM", "0") == "1"
+
+# Live inference executors (app.scheduler): threads for classical models,
+# processes for quantum simulation (0 runs quantum models on the threads).
+# None sizes the thread pool to the sum of MODEL_CONCURRENCY over the models
+# it runs, so every model can use all of its slots at once
+INFERENCE_THREADS = None
+INFERENCE_PROCESSES = 2
+
+# Jobs one model may run at once, and how many more may wait for a slot
+# before requests for it get 429 Too Many Requests
+MODEL_CONCURRENCY = {
+    "random_forest": 2,
+    "logreg": 2,
+    "svm_linear": 2,
+    "quantum_vqc": 2,
+    "quantum_qnn": 2,
+}
+MODEL_QUEUE_LIMIT = 32
+
+# Micro-batching of concurrent live /api/predict calls (app.batcher): rows
+# for one model are collected for up to MICROBATCH_MAX_WAIT_MS, or until
+# MICROBATCH_MAX_ROWS arrive, and scored in one call. MAX_ROWS 1 disables it.
+MICROBATCH_MAX_ROWS = 64
+MICROBATCH_MAX_WAIT_MS = 2.0
+
 # Features used for model training
 FEATURE_COLS = [
     "daily_return",
@@ -0,0 +1,234 @@
+import bisect
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.data.feature_store import (
+    FEATURES_MATRIX,
+    LABEL_COL,
+    LABELS,
+    ROW_INDEX_MATRIX,
+    STORE_DIR,
+    build_row_index,
+    chunk_bounds,
+    format_date,
+    map_column,
+    map_matrix,
+    read_store_meta,
+    store_is_fresh,
+)
+from app.data.load_data import load_or_build_all_data
+
+# Rows copied out of the memory maps per block by iter_chunks()
+DEFAULT_CHUNK_ROWS = 65_536
+
+PRICE_COL = "Adj Close"
+
+
+@dataclass
+class FeatureIndex:
+    """
+    Prebuilt (ticker, date) -> row lookup over a contiguous feature matrix.
+
+    - features:    float64 matrix of shape (N, len(config.FEATURE_COLS))
+    - label_codes: int8 code into LABELS of the true label per row
+    - adj_close:   float64 `Adj Close` per row, for the backtest simulator
+    - row_index:   int32 matrix of shape (n_tickers, n_dates) holding the row
+                   offset into `features` for each (ticker, date), or -1 when
+                   there is no data (weekend, holiday, before listing, ...)
+
+    When loaded from the feature store, the arrays are read-only memory maps,
+    so several uvicorn workers share a single copy through the page cache.
+    """
+
+    tickers: List[str]
+    dates: List[str]
+    features: np.ndarray
+    label_codes: np.ndarray
+    row_index: np.ndarray
+    adj_close: np.ndarray
+    ticker_pos: Dict[str, int] = field(init=False, repr=False)
+    date_pos: Dict[str, int] = field(init=False, repr=False)
+    _fingerprint: Optional[str] = field(default=None, init=False, repr=False)
+    _row_coords: Optional[Tuple[np.ndarray, np.ndarray]] = field(
+        default=None, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        self.ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self.date_pos = {d: i for i, d in enumerate(self.dates)}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "FeatureIndex":
+        """
+        Build the index in memory from the long dataframe returned by
+        load_or_build_all_data().
+        """
+        ticker_codes, tickers = pd.factorize(df["ticker"].astype(str), sort=True)
+        date_ints = (
+            df["Date"].astype(str).str.replace("-", "", regex=False).astype(np.int32).to_numpy()
+        )
+        dates, row_index = build_row_index(ticker_codes, date_ints, n_tickers=len(tickers))
+
+        features = np.ascontiguousarray(
+            df[config.FEATURE_COLS].to_numpy(dtype=np.float64)
+        )
+        label_codes = pd.Categorical(df[LABEL_COL].astype(str), categories=LABELS).codes
+
+        return cls(
+            tickers=[str(t) for t in tickers],
+            dates=[format_date(d) for d in dates.tolist()],
+            features=features,
+            label_codes=label_codes.astype(np.int8),
+            row_index=row_index,
+            adj_close=df[PRICE_COL].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def from_store(cls, meta: dict, store_dir: Path = STORE_DIR) -> "FeatureIndex":
+        """
+        Memory-map the serving arrays of a compiled feature store (read-only).
+        """
+        return cls(
+            tickers=list(meta["tickers"]),
+            dates=[format_date(d) for d in meta["dates"]],
+            features=map_matrix(meta, FEATURES_MATRIX, store_dir),
+            label_codes=map_column(meta, LABEL_COL, store_dir),
+            row_index=map_matrix(meta, ROW_INDEX_MATRIX, store_dir),
+            adj_close=map_column(meta, PRICE_COL, store_dir),
+        )
+
+    def __len__(self) -> int:
+        return int(self.features.shape[0])
+
+    def row_coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Inverse of row_index: (ticker_codes, date_codes) per row, int32 of
+        shape (N,). Rows that row_index does not point to (duplicate
+        ticker/date rows) get -1. Computed once, then cached.
+        """
+        if self._row_coords is None:
+            row_index = np.asarray(self.row_index)
+            t_idx, d_idx = np.nonzero(row_index >= 0)
+            rows = row_index[t_idx, d_idx]
+
+            ticker_codes = np.full(len(self), -1, dtype=np.int32)
+            date_codes = np.full(len(self), -1, dtype=np.int32)
+            ticker_codes[rows] = t_idx
+            date_codes[rows] = d_idx
+            self._row_coords = (ticker_codes, date_codes)
+        return self._row_coords
+
+    def fingerprint(self) -> str:
+        """
+        sha1 over the (ticker, date) of every row and the feature values.
+        Anything keyed by row offset (e.g. the prediction table) is only valid
+        for an index with the same fingerprint. Independent of ticker code
+        order, so the store and the in-memory fallback agree. Computed once,
+        then cached.
+        """
+        if self._fingerprint is None:
+            ticker_codes, date_codes = self.row_coordinates()
+            mapped = ticker_codes >= 0
+            row_tickers = np.asarray(self.tickers)[ticker_codes[mapped]]
+            row_dates = np.asarray(self.dates)[date_codes[mapped]]
+
+            h = hashlib.sha1()
+            h.update(json.dumps([row_tickers.tolist(), row_dates.tolist()]).encode())
+            h.update(np.ascontiguousarray(self.features).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def lookup(self, ticker: str, date: str) -> Optional[int]:
+        """
+        Return the row offset for (ticker, date), or None if there is no data.
+        """
+        t = self.ticker_pos.get(ticker)
+        d = self.date_pos.get(date)
+        if t is None or d is None:
+            return None
+
+        row = int(self.row_index[t, d])
+        return row if row >= 0 else None
+
+    def listed_tickers(self) -> List[str]:
+        """
+        Tickers with at least one row, sorted.
+        """
+        has_rows = (np.asarray(self.row_index) >= 0).any(axis=1)
+        return sorted(t for t, listed in zip(self.tickers, has_rows) if listed)
+
+    def feature_row(self, row: int) -> np.ndarray:
+        """
+        Return the (1, n_features) matrix for one row, ready for predict_proba.
+        """
+        return self.features[row : row + 1]
+
+    def select_rows(
+        self, tickers: List[str], start_date: str, end_date: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        All rows for `tickers` with start_date <= date <= end_date (ISO strings).
+
+        Returns (rows, ticker_codes, date_codes) ordered ticker by ticker (in the
+        order given), then by date. Unknown tickers and missing days are skipped.
+        """
+        codes = [self.ticker_pos[t] for t in tickers if t in self.ticker_pos]
+        d_lo = bisect.bisect_left(self.dates, start_date)
+        d_hi = bisect.bisect_right(self.dates, end_date)
+        if not codes or d_lo >= d_hi:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        block = np.asarray(self.row_index[np.asarray(codes), d_lo:d_hi])
+        t_idx, d_idx = np.nonzero(block >= 0)
+        rows = block[t_idx, d_idx].astype(np.int64)
+        return rows, np.asarray(codes)[t_idx], d_idx + d_lo
+
+    def iter_chunks(
+        self, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Yield (start, features, label_codes) for consecutive blocks of at most
+        chunk_rows rows. Each block is an in-memory copy, so a full pass over
+        a memory-mapped store only ever holds one block.
+        """
+        for start, stop in chunk_bounds(len(self), chunk_rows):
+            yield (
+                start,
+                np.asarray(self.features[start:stop]),
+                np.asarray(self.label_codes[start:stop]),
+            )
+
+    def feature_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Gather many rows into one contiguous (len(rows), n_features) matrix.
+        """
+        return np.ascontiguousarray(self.features[rows])
+
+
+def load_feature_index(tickers: List[str] = None, store_dir: Path = STORE_DIR) -> FeatureIndex:
+    """
+    Memory-map the index from the compiled feature store when it is fresh;
+    otherwise build it in memory from the dataframe loader.
+    """
+    if tickers is None:
+        tickers = config.TICKERS
+
+    meta = read_store_meta(store_dir)
+    if (
+        meta is not None
+        and set(meta["tickers"]) <= set(tickers)
+        and store_is_fresh(meta, tickers)
+    ):
+        print(f"Memory-mapping feature index from {store_dir}")
+        return FeatureIndex.from_store(meta, store_dir)
+
+    print("Feature store missing or stale; building feature index in memory...")
+    return FeatureIndex.from_dataframe(load_or_build_all_data(tickers))
@@ -0,0 +1,493 @@
+"""
+Compiled columnar store for the processed feature/label data.
+
+Parsing ~190 per-ticker CSVs on every cold start is slow, so this module
+compiles them into one directory of raw little-endian column files:
+
+    data/store/
+      meta.json           row count, column dtypes, vocabularies, source fingerprints
+      date.bin            int32 dates as YYYYMMDD
+      ticker.bin          int16 codes into meta["tickers"]
+      label.bin           int8 codes into meta["labels"]
+      <column>.bin        one file per numeric column (Adj Close, features, ...)
+      features.bin        float64 (n_rows, len(FEATURE_COLS)) row-major feature matrix
+      row_index.bin       int32 (n_tickers, n_dates) (ticker, date) -> row, -1 if missing
+
+Everything is a flat array on disk, so the API can np.memmap it read-only and
+every uvicorn worker shares the same pages through the OS page cache.
+
+The store is built by streaming one ticker's processed block at a time onto
+the end of every column file; only the row index is rebuilt from the files
+afterwards, in chunks. Peak memory is one ticker plus the row index no
+matter how many tickers there are, and new tickers are appended in place
+without rewriting the rows already stored. meta.json is written last, so
+rows only become visible once an append has finished.
+
+Build it with:
+    python -m app.data.feature_store [--append]
+"""
+
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.data.load_data import DATA_DIR, PROCESSED_DIR, file_sha1, processed_csv_path
+
+STORE_DIR = DATA_DIR / "store"
+META_FILENAME = "meta.json"
+STORE_VERSION = 2
+
+LABELS: List[str] = ["BUY", "HOLD", "SELL"]
+
+# Columns that are dictionary/integer encoded instead of stored as-is
+DATE_COL = "Date"
+TICKER_COL = "ticker"
+LABEL_COL = "label"
+
+# Derived serving matrices (see app.data.feature_index)
+FEATURES_MATRIX = "features"
+ROW_INDEX_MATRIX = "row_index"
+
+# Rows read at a time when rebuilding the row index
+_COMMIT_CHUNK_ROWS = 1 << 20
+
+
+def chunk_bounds(n_rows: int, chunk_rows: int) -> List[Tuple[int, int]]:
+    """
+    [start, stop) bounds of consecutive blocks of at most chunk_rows rows.
+    """
+    return [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+
+def _column_filename(column: str) -> str:
+    return column.strip().lower().replace(" ", "_") + ".bin"
+
+
+def _source_fingerprint(path: Path, with_hash: bool = True) -> Dict[str, object]:
+    st = path.stat()
+    fp: Dict[str, object] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["sha1"] = file_sha1(path)
+    return fp
+
+
+def _source_is_unchanged(path: Path, recorded: Dict[str, object]) -> bool:
+    """
+    Cheap check first (size + mtime); only hash the file when the mtime moved,
+    e.g. after a fresh git checkout or a Docker COPY.
+    """
+    current = _source_fingerprint(path, with_hash=False)
+    if current["size"] != recorded.get("size"):
+        return False
+    if current["mtime_ns"] == recorded.get("mtime_ns"):
+        return True
+    return file_sha1(path) == recorded.get("sha1")
+
+
+def _encode_dates(dates: pd.Series) -> np.ndarray:
+    """
+    "YYYY-MM-DD" strings -> int32 YYYYMMDD.
+    """
+    return dates.astype(str).str.replace("-", "", regex=False).astype(np.int32).to_numpy()
+
+
+def format_date(date_int: int) -> str:
+    return f"{date_int // 10000:04d}-{date_int // 100 % 100:02d}-{date_int % 100:02d}"
+
+
+def decode_dates(date_ints: np.ndarray) -> np.ndarray:
+    """
+    int32 YYYYMMDD -> "YYYY-MM-DD" strings (formats each distinct date once).
+    """
+    uniq, inverse = np.unique(np.asarray(date_ints), return_inverse=True)
+    labels = np.array([format_date(d) for d in uniq.tolist()], dtype=object)
+    return labels[inverse]
+
+
+def build_row_index(
+    ticker_codes: np.ndarray, date_ints: np.ndarray, n_tickers: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (sorted distinct date ints, (n_tickers, n_dates) int32 row index).
+    Assigned in reverse so the first row wins on duplicate (ticker, date).
+    """
+    dates = np.unique(date_ints)
+    date_codes = np.searchsorted(dates, date_ints)
+
+    row_index = np.full((n_tickers, len(dates)), -1, dtype=np.int32)
+    rows = np.arange(len(date_ints), dtype=np.int32)
+    row_index[ticker_codes[::-1], date_codes[::-1]] = rows[::-1]
+    return dates, row_index
+
+
+def _write_array(arr: np.ndarray, path: Path) -> Dict[str, object]:
+    arr = np.ascontiguousarray(arr)
+    arr = arr.astype(arr.dtype.newbyteorder("<"), copy=False)
+    arr.tofile(path)
+    return {"file": path.name, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+
+def _append_array(arr: np.ndarray, path: Path, dtype: str) -> None:
+    with path.open("ab") as f:
+        np.ascontiguousarray(arr, dtype=np.dtype(dtype)).tofile(f)
+
+
+def iter_processed_blocks(
+    tickers: List[str],
+) -> Iterator[Tuple[str, pd.DataFrame, Dict[str, object]]]:
+    """
+    Yield (ticker, processed rows, source fingerprint) one ticker at a time,
+    so only one ticker's block is ever parsed into memory.
+    """
+    for t in tickers:
+        path = processed_csv_path(t)
+        if not path.exists():
+            print(f"Warning: No processed file found for ticker {t}, skipping...")
+            continue
+        source = _source_fingerprint(path)
+        yield t, pd.read_csv(path), source
+
+
+def _column_specs(df: pd.DataFrame) -> List[Dict[str, str]]:
+    encoded = {DATE_COL: np.int32, TICKER_COL: np.int16, LABEL_COL: np.int8}
+    return [
+        {
+            "name": col,
+            "file": _column_filename(col),
+            "dtype": np.dtype(encoded.get(col, df[col].dtype)).newbyteorder("<").str,
+        }
+        for col in df.columns
+    ]
+
+
+def _empty_meta() -> dict:
+    return {
+        "version": STORE_VERSION,
+        "n_rows": 0,
+        "columns": [],
+        "matrices": {},
+        "feature_cols": list(config.FEATURE_COLS),
+        "tickers": [],
+        "dates": [],
+        "labels": LABELS,
+        "sources": {},
+    }
+
+
+def _truncate_to(meta: dict, store_dir: Path) -> None:
+    """
+    Cut every column file back to meta["n_rows"] rows, dropping whatever an
+    interrupted append left behind.
+    """
+    n_rows = meta["n_rows"]
+    n_features = len(meta["feature_cols"])
+    files = [(spec["file"], np.dtype(spec["dtype"]).itemsize * n_rows) for spec in meta["columns"]]
+    files.append((f"{FEATURES_MATRIX}.bin", 8 * n_features * n_rows))
+    for name, size in files:
+        path = store_dir / name
+        if path.exists() and path.stat().st_size > size:
+            os.truncate(path, size)
+
+
+def _append_block(meta: dict, store_dir: Path, ticker: str, df: pd.DataFrame, source: Dict[str, object]) -> None:
+    """
+    Append one ticker's processed rows to the column files and the features
+    matrix. The rows only become visible once _commit_store writes the meta.
+    """
+    if not meta["columns"]:
+        meta["columns"] = _column_specs(df)
+    names = [spec["name"] for spec in meta["columns"]]
+    if list(df.columns) != names:
+        raise ValueError(f"{ticker}: columns {list(df.columns)} do not match the store's {names}")
+    if (df[TICKER_COL].astype(str) != ticker).any():
+        raise ValueError(f"{ticker}: processed file contains rows of other tickers")
+
+    code = len(meta["tickers"])
+    if code > np.iinfo(np.int16).max:
+        raise ValueError("Too many tickers for the int16 ticker column")
+    label_codes = pd.Categorical(df[LABEL_COL].astype(str), categories=LABELS).codes
+    if (label_codes < 0).any():
+        raise ValueError(f"{ticker}: unexpected label values in processed data")
+
+    encoded = {
+        DATE_COL: _encode_dates(df[DATE_COL]),
+        TICKER_COL: np.full(len(df), code),
+        LABEL_COL: label_codes,
+    }
+    for spec in meta["columns"]:
+        arr = encoded.get(spec["name"])
+        if arr is None:
+            arr = df[spec["name"]].to_numpy()
+        _append_array(arr, store_dir / spec["file"], spec["dtype"])
+    _append_array(
+        df[config.FEATURE_COLS].to_numpy(dtype=np.float64),
+        store_dir / f"{FEATURES_MATRIX}.bin",
+        "<f8",
+    )
+
+    meta["tickers"].append(ticker)
+    meta["sources"][ticker] = source
+    meta["n_rows"] += int(len(df))
+
+
+def _commit_store(meta: dict, store_dir: Path) -> None:
+    """
+    Rebuild the date vocabulary and row index from the column files, chunk
+    by chunk, then write the meta (which is what makes appended rows live).
+    """
+    n_rows = meta["n_rows"]
+    date_ints = map_column(meta, DATE_COL, store_dir)
+    ticker_codes = map_column(meta, TICKER_COL, store_dir)
+    bounds = chunk_bounds(n_rows, _COMMIT_CHUNK_ROWS)
+
+    dates = np.empty(0, dtype=np.int32)
+    for start, stop in bounds:
+        dates = np.union1d(dates, np.unique(date_ints[start:stop]))
+
+    # Chunks and rows in reverse so the first row wins on duplicate (ticker, date)
+    row_index = np.full((len(meta["tickers"]), len(dates)), -1, dtype=np.int32)
+    for start, stop in reversed(bounds):
+        d = np.searchsorted(dates, date_ints[start:stop])
+        t = ticker_codes[start:stop].astype(np.int64)
+        row_index[t[::-1], d[::-1]] = np.arange(start, stop, dtype=np.int32)[::-1]
+    del date_ints, ticker_codes
+
+    tmp = store_dir / f"{ROW_INDEX_MATRIX}.bin.tmp"
+    spec = _write_array(row_index, tmp)
+    os.replace(tmp, store_dir / f"{ROW_INDEX_MATRIX}.bin")
+
+    meta["dates"] = [int(d) for d in dates]
+    meta["matrices"] = {
+        FEATURES_MATRIX: {
+            "file": f"{FEATURES_MATRIX}.bin",
+            "dtype": "<f8",
+            "shape": [n_rows, len(meta["feature_cols"])],
+        },
+        ROW_INDEX_MATRIX: {**spec, "file": f"{ROW_INDEX_MATRIX}.bin"},
+    }
+    tmp = store_dir / f"{META_FILENAME}.tmp"
+    with tmp.open("w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, store_dir / META_FILENAME)
+
+
+def build_feature_store(tickers: List[str] = None, store_dir: Path = STORE_DIR) -> Path:
+    """
+    Compile data/processed/*_features_labels.csv into the columnar store.
+
+    Tickers are streamed in one at a time and appended to the column files,
+    so peak memory is one ticker's block plus the row index, not the whole
+    dataset. The new store is written next to the old one and swapped in at
+    the end.
+    """
+    if tickers is None:
+        tickers = config.TICKERS
+
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    meta = _empty_meta()
+    for ticker, df, source in iter_processed_blocks(tickers):
+        _append_block(meta, tmp_dir, ticker, df, source)
+
+    if not meta["tickers"]:
+        shutil.rmtree(tmp_dir)
+        raise RuntimeError(f"No processed data files found in {PROCESSED_DIR}.")
+
+    _commit_store(meta, tmp_dir)
+
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+
+    print(
+        f"Wrote feature store with {meta['n_rows']} rows from "
+        f"{len(meta['tickers'])} tickers to {store_dir}"
+    )
+    return store_dir
+
+
+def append_to_feature_store(tickers: List[str], store_dir: Path = STORE_DIR) -> int:
+    """
+    Append the processed rows of `tickers` that are not in the store yet, in
+    place. Rows already in the store are never rewritten, and readers that
+    have the old files mapped keep seeing a consistent (older) store.
+
+    Returns the number of rows appended.
+    """
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No feature store at {store_dir}; build it first.")
+    if meta.get("feature_cols") != list(config.FEATURE_COLS):
+        raise RuntimeError("Feature columns changed; rebuild the feature store instead.")
+
+    _truncate_to(meta, store_dir)
+    n_before, tickers_before = meta["n_rows"], len(meta["tickers"])
+    new = [t for t in tickers if t not in meta["sources"]]
+    for ticker, df, source in iter_processed_blocks(new):
+        _append_block(meta, store_dir, ticker, df, source)
+
+    if meta["n_rows"] > n_before:
+        _commit_store(meta, store_dir)
+    print(
+        f"Appended {meta['n_rows'] - n_before} rows from "
+        f"{len(meta['tickers']) - tickers_before} new ticker(s) to {store_dir}"
+    )
+    return meta["n_rows"] - n_before
+
+
+def update_feature_store(tickers: List[str] = None, store_dir: Path = STORE_DIR) -> Path:
+    """
+    Bring the store up to date with data/processed: append new tickers when
+    every stored ticker is unchanged, rebuild it otherwise.
+    """
+    if tickers is None:
+        tickers = config.TICKERS
+
+    meta = read_store_meta(store_dir)
+    if meta is not None and store_is_fresh(meta, list(meta["sources"])):
+        append_to_feature_store(tickers, store_dir)
+        return store_dir
+    return build_feature_store(tickers, store_dir)
+
+
+def read_store_meta(store_dir: Path = STORE_DIR) -> Optional[dict]:
+    meta_path = store_dir / META_FILENAME
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.load(meta_path.open("r"))
+    except Exception as e:
+        print(f"Could not read feature store metadata: {e!r}")
+        return None
+    if meta.get("version") != STORE_VERSION:
+        return None
+    return meta
+
+
+def store_is_fresh(meta: dict, tickers: List[str]) -> bool:
+    """
+    The store is fresh for `tickers` if every ticker that has a processed CSV
+    is in the store with an unchanged source file, and no stored ticker has
+    lost its CSV.
+    """
+    if meta.get("feature_cols") != list(config.FEATURE_COLS):
+        return False
+
+    sources = meta.get("sources", {})
+    for t in tickers:
+        path = processed_csv_path(t)
+        recorded = sources.get(t)
+        if not path.exists():
+            if recorded is not None:
+                return False
+            continue
+        if recorded is None or not _source_is_unchanged(path, recorded):
+            return False
+    return True
+
+
+def read_column(meta: dict, column: str, store_dir: Path = STORE_DIR) -> np.ndarray:
+    for spec in meta["columns"]:
+        if spec["name"] == column:
+            return np.fromfile(store_dir / spec["file"], dtype=np.dtype(spec["dtype"]))
+    raise KeyError(f"Column {column!r} not in feature store")
+
+
+def map_column(meta: dict, column: str, store_dir: Path = STORE_DIR) -> np.ndarray:
+    """
+    Read-only memory map of one column; pages are shared between processes.
+    """
+    for spec in meta["columns"]:
+        if spec["name"] == column:
+            return np.memmap(
+                store_dir / spec["file"],
+                dtype=np.dtype(spec["dtype"]),
+                mode="r",
+                shape=(meta["n_rows"],),
+            )
+    raise KeyError(f"Column {column!r} not in feature store")
+
+
+def map_matrix(meta: dict, name: str, store_dir: Path = STORE_DIR) -> np.ndarray:
+    """
+    Read-only memory map of one of the derived serving matrices.
+    """
+    spec = meta["matrices"][name]
+    return np.memmap(
+        store_dir / spec["file"],
+        dtype=np.dtype(spec["dtype"]),
+        mode="r",
+        shape=tuple(spec["shape"]),
+    )
+
+
+def load_feature_store(
+    tickers: List[str] = None, store_dir: Path = STORE_DIR
+) -> Optional[pd.DataFrame]:
+    """
+    Load the store as the same long dataframe load_or_build_all_data() returns.
+    Returns None when the store is missing or stale so callers can fall back
+    to parsing the CSVs.
+    """
+    if tickers is None:
+        tickers = config.TICKERS
+
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        return None
+    if not store_is_fresh(meta, tickers):
+        print(f"Feature store at {store_dir} is stale; falling back to CSVs.")
+        return None
+
+    store_tickers = np.array(meta["tickers"], dtype=object)
+    ticker_codes = read_column(meta, TICKER_COL, store_dir)
+
+    requested = set(tickers)
+    wanted = [i for i, t in enumerate(meta["tickers"]) if t in requested]
+    mask = None
+    if len(wanted) != len(store_tickers):
+        mask = np.isin(ticker_codes, np.array(wanted, dtype=ticker_codes.dtype))
+
+    data = {}
+    for spec in meta["columns"]:
+        col = spec["name"]
+        arr = read_column(meta, col, store_dir)
+        if mask is not None:
+            arr = arr[mask]
+        if col == DATE_COL:
+            arr = decode_dates(arr)
+        elif col == TICKER_COL:
+            arr = store_tickers[arr]
+        elif col == LABEL_COL:
+            arr = np.array(meta["labels"], dtype=object)[arr]
+        data[col] = arr
+
+    df = pd.DataFrame(data)
+    for col in (DATE_COL, TICKER_COL, LABEL_COL):
+        df[col] = df[col].astype(str)
+
+    print(f"Loaded {len(df)} total rows from {len(wanted)} tickers (feature store)")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile data/processed into the columnar store.")
+    parser.add_argument(
+        "--append", action="store_true", help="Only append tickers that are not in the store yet"
+    )
+    args = parser.parse_args()
+
+    if args.append:
+        append_to_feature_store(config.TICKERS)
+    else:
+        build_feature_store()
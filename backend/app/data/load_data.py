@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 from typing import List
 
@@ -25,6 +26,21 @@ RAW_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def processed_csv_path(ticker: str) -> Path:
+    return PROCESSED_DIR / f"{ticker}_features_labels.csv"
+
+
+def file_sha1(path: Path) -> str:
+    """
+    SHA-1 of a file's contents, read in 1 MB blocks.
+    """
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 # Download raw data for one ticker
 def download_raw_data(ticker: str) -> pd.DataFrame:
     """
@@ -175,7 +191,7 @@ def build_or_load_processed_ticker(ticker: str) -> pd.DataFrame:
     
     Only load existing files, don't download in production.
     """
-    processed_path = PROCESSED_DIR / f"{ticker}_features_labels.csv"
+    processed_path = processed_csv_path(ticker)
     if processed_path.exists():
         return pd.read_csv(processed_path)
 
@@ -192,12 +208,22 @@ def load_or_build_all_data(tickers: List[str] = None) -> pd.DataFrame:
     
     MODIFIED: Only loads existing files, never downloads fresh data.
     This prevents memory issues on deployment platforms.
+
+    Reads the compiled columnar store (see app.data.feature_store) when it is
+    present and up to date, and only parses the per-ticker CSVs otherwise.
     """
     import traceback
 
+    # Imported here because feature_store imports the paths from this module
+    from app.data.feature_store import load_feature_store
+
     if tickers is None:
         tickers = config.TICKERS
 
+    store_df = load_feature_store(tickers)
+    if store_df is not None:
+        return store_df
+
     # Check if processed directory has files
     processed_files = list(PROCESSED_DIR.glob("*_features_labels.csv"))
     
@@ -212,7 +238,7 @@ def load_or_build_all_data(tickers: List[str] = None) -> pd.DataFrame:
     frames = []
     for t in tickers:
         try:
-            processed_path = PROCESSED_DIR / f"{t}_features_labels.csv"
+            processed_path = processed_csv_path(t)
             if processed_path.exists():
                 print(f"Loading ticker {t} from {processed_path.name}...")
                 df_t = pd.read_csv(processed_path)
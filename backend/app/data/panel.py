@@ -0,0 +1,235 @@
+"""
+Dense date x ticker panel of the dataset.
+
+The long dataframe (and the feature index over it) keeps one row per
+(ticker, date). Questions like "every ticker on a date" or "one ticker over a
+range" then go through the row index. The panel lays the same data out as
+dense arrays, so those questions become slices:
+
+    data/panel/
+      meta.json      version, index fingerprint, tickers, dates, feature columns
+      features.npy   float32 (n_dates, n_tickers, n_features), NaN where no row
+      labels.npy     int8    (n_dates, n_tickers) code into LABELS, -1 where no label
+      valid.npy      bool    (n_dates, n_tickers) True where the ticker has a row
+      rows.npy       int32   (n_dates, n_tickers) row offset into the feature
+                     index (and the prediction table), -1 where no row
+
+It is built offline from the feature index (the Dockerfile does this after
+compiling the store). The API memory-maps it for ticker listing, date
+validation and selecting batch rows when it matches the index fingerprint,
+and otherwise answers those from the feature index; it never builds the
+panel itself.
+
+Build it with:
+    python -m app.data.panel
+"""
+
+import bisect
+import fcntl
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.data.load_data import DATA_DIR
+
+PANEL_DIR = DATA_DIR / "panel"
+PANEL_VERSION = 1
+
+_ARRAYS = ("features", "labels", "valid", "rows")
+
+
+@dataclass
+class Panel:
+    """
+    The dataset as (date, ticker[, feature]) arrays; see the module docstring.
+    Loaded from disk the arrays are read-only memory maps.
+    """
+
+    tickers: List[str]
+    dates: List[str]
+    features: np.ndarray
+    labels: np.ndarray
+    valid: np.ndarray
+    rows: np.ndarray
+    ticker_pos: Dict[str, int] = field(init=False, repr=False)
+    date_pos: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self.date_pos = {d: i for i, d in enumerate(self.dates)}
+
+    @classmethod
+    def from_index(cls, index: FeatureIndex, dtype=np.float32) -> "Panel":
+        ticker_codes, date_codes = index.row_coordinates()
+        mapped = np.flatnonzero(ticker_codes >= 0)
+        t, d = ticker_codes[mapped], date_codes[mapped]
+        shape = (len(index.dates), len(index.tickers))
+
+        features = np.full((*shape, index.features.shape[1]), np.nan, dtype=dtype)
+        features[d, t] = np.asarray(index.features)[mapped]
+        labels = np.full(shape, -1, dtype=np.int8)
+        labels[d, t] = np.asarray(index.label_codes)[mapped]
+        rows = np.full(shape, -1, dtype=np.int32)
+        rows[d, t] = mapped
+
+        return cls(
+            tickers=list(index.tickers),
+            dates=list(index.dates),
+            features=features,
+            labels=labels,
+            valid=rows >= 0,
+            rows=rows,
+        )
+
+    def listed_tickers(self) -> List[str]:
+        """
+        Tickers with at least one row, sorted.
+        """
+        return sorted(t for t, has_rows in zip(self.tickers, self.valid.any(axis=0)) if has_rows)
+
+    def date_range(self, start_date: str, end_date: str) -> slice:
+        """
+        Date positions with start_date <= date <= end_date (ISO strings).
+        """
+        return slice(
+            bisect.bisect_left(self.dates, start_date),
+            bisect.bisect_right(self.dates, end_date),
+        )
+
+    def has_row(self, ticker: str, date: str) -> bool:
+        t = self.ticker_pos.get(ticker)
+        d = self.date_pos.get(date)
+        return t is not None and d is not None and bool(self.valid[d, t])
+
+    def cross_section(self, date: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (features (n_tickers, n_features), valid (n_tickers,)) on one date.
+        """
+        d = self.date_pos[date]
+        return self.features[d], self.valid[d]
+
+    def ticker_series(self, ticker: str, start_date: str, end_date: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (features (n_days, n_features), valid (n_days,)) for one ticker over
+        the calendar between start_date and end_date.
+        """
+        t = self.ticker_pos[ticker]
+        span = self.date_range(start_date, end_date)
+        return self.features[span, t], self.valid[span, t]
+
+    def select(
+        self, tickers: List[str], start_date: str, end_date: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same contract as FeatureIndex.select_rows: (rows, ticker_codes,
+        date_codes) ordered ticker by ticker (in the order given), then by
+        date; unknown tickers and missing days are skipped.
+        """
+        codes = np.asarray([self.ticker_pos[t] for t in tickers if t in self.ticker_pos], dtype=np.int64)
+        span = self.date_range(start_date, end_date)
+        if codes.size == 0 or span.start >= span.stop:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        # (n_tickers, n_days) so nonzero() walks ticker by ticker
+        block = np.asarray(self.rows[span, codes]).T
+        t_idx, d_idx = np.nonzero(block >= 0)
+        return block[t_idx, d_idx].astype(np.int64), codes[t_idx], d_idx + span.start
+
+
+def _read_meta(panel_dir: Path) -> Optional[dict]:
+    meta_path = panel_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.load(meta_path.open("r"))
+    except Exception as e:
+        print(f"Could not read panel metadata: {e!r}")
+        return None
+    return meta if meta.get("version") == PANEL_VERSION else None
+
+
+def _is_fresh(meta: Optional[dict], index: FeatureIndex) -> bool:
+    return (
+        meta is not None
+        and meta["index_fingerprint"] == index.fingerprint()
+        and meta["feature_cols"] == list(config.FEATURE_COLS)
+    )
+
+
+def _map_panel(meta: dict, panel_dir: Path) -> Panel:
+    arrays = {name: np.load(panel_dir / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+    return Panel(tickers=meta["tickers"], dates=meta["dates"], **arrays)
+
+
+def build_panel(index: FeatureIndex, panel_dir: Path = PANEL_DIR) -> Panel:
+    """
+    Build the panel from `index`, write it to panel_dir and return it
+    memory-mapped from there. Builders hold a lock next to panel_dir and
+    write into their own tmp dir, swapped in at the end; one that finds
+    the panel already rebuilt by another just maps it.
+    """
+    panel_dir.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = panel_dir.with_name(panel_dir.name + ".lock")
+    with lock_path.open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        meta = _read_meta(panel_dir)
+        if _is_fresh(meta, index):
+            print(f"Panel in {panel_dir} is already up to date")
+            return _map_panel(meta, panel_dir)
+
+        panel = Panel.from_index(index)
+
+        tmp_dir = panel_dir.with_name(f"{panel_dir.name}.tmp.{os.getpid()}")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        for name in _ARRAYS:
+            np.save(tmp_dir / f"{name}.npy", getattr(panel, name))
+        meta = {
+            "version": PANEL_VERSION,
+            "index_fingerprint": index.fingerprint(),
+            "feature_cols": list(config.FEATURE_COLS),
+            "tickers": panel.tickers,
+            "dates": panel.dates,
+        }
+        with (tmp_dir / "meta.json").open("w") as f:
+            json.dump(meta, f)
+
+        if panel_dir.exists():
+            shutil.rmtree(panel_dir)
+        os.replace(tmp_dir, panel_dir)
+
+    size_mb = sum(getattr(panel, name).nbytes for name in _ARRAYS) / 1e6
+    print(
+        f"Wrote {len(panel.dates)} x {len(panel.tickers)} panel "
+        f"({size_mb:.1f} MB) to {panel_dir}"
+    )
+    return _map_panel(meta, panel_dir)
+
+
+def load_panel(index: FeatureIndex, panel_dir: Path = PANEL_DIR) -> Optional[Panel]:
+    """
+    Memory-map the cached panel when it was built from this exact index;
+    otherwise return None (build it with `python -m app.data.panel`).
+    """
+    meta = _read_meta(panel_dir)
+    if not _is_fresh(meta, index):
+        print("Panel missing or stale; serving from the feature index (run python -m app.data.panel)")
+        return None
+
+    print(f"Memory-mapping panel from {panel_dir}")
+    return _map_panel(meta, panel_dir)
+
+
+if __name__ == "__main__":
+    build_panel(load_feature_index())
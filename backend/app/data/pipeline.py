@@ -0,0 +1,186 @@
+"""
+Parallel, incremental rebuild of data/processed.
+
+Each ticker is downloaded (or read from the data/raw cache), turned into
+features + labels and written to data/processed/<TICKER>_features_labels.csv
+in a process pool. data/processed/manifest.json records, per ticker, the
+hash of the raw input and of the labeling parameters it was built with, so
+a rerun only rebuilds tickers whose inputs or parameters changed.
+
+Run with:
+    python -m app.data.pipeline [--workers N] [--force] [--tickers AAPL MSFT ...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app import config
+from app.data.feature_store import update_feature_store
+from app.data.load_data import (
+    PROCESSED_DIR,
+    RAW_DIR,
+    build_features_and_labels,
+    download_raw_data,
+    file_sha1,
+    processed_csv_path,
+)
+
+MANIFEST_PATH = PROCESSED_DIR / "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def labeling_params() -> Dict[str, object]:
+    """
+    Every config value that changes the contents of a processed file.
+    """
+    return {
+        "START_DATE": config.START_DATE,
+        "END_DATE": config.END_DATE,
+        "LABEL_HORIZON_DAYS": config.LABEL_HORIZON_DAYS,
+        "BUY_THRESHOLD": config.BUY_THRESHOLD,
+        "SELL_THRESHOLD": config.SELL_THRESHOLD,
+        "FEATURE_COLS": list(config.FEATURE_COLS),
+    }
+
+
+def params_hash(params: Dict[str, object]) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _raw_path(ticker: str) -> Path:
+    # Same cache location download_raw_data() uses
+    return RAW_DIR / f"{ticker}_{config.START_DATE}_{config.END_DATE}.csv"
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict[str, object]:
+    if path.exists():
+        try:
+            manifest = json.load(path.open("r"))
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except Exception as e:
+            print(f"Could not read manifest {path}: {e!r}")
+    return {"version": MANIFEST_VERSION, "tickers": {}}
+
+
+def save_manifest(manifest: Dict[str, object], path: Path = MANIFEST_PATH) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def needs_rebuild(ticker: str, entry: Optional[Dict[str, object]], p_hash: str) -> Optional[str]:
+    """
+    Return why `ticker` must be rebuilt, or None if it is up to date.
+    """
+    processed = processed_csv_path(ticker)
+    if entry is None:
+        return "not in manifest"
+    if not processed.exists():
+        return "processed file missing"
+    if entry.get("params_hash") != p_hash:
+        return "labeling parameters changed"
+    if processed.stat().st_size != entry.get("processed_size"):
+        return "processed file changed"
+
+    # Raw data is a local cache and may be absent (e.g. fresh clone); only
+    # compare it when it is there.
+    raw = _raw_path(ticker)
+    if raw.exists() and file_sha1(raw) != entry.get("raw_sha1"):
+        return "raw data changed"
+    return None
+
+
+def _build_ticker(ticker: str, p_hash: str) -> Dict[str, object]:
+    """
+    Worker: raw data -> features + labels -> processed CSV. Returns the
+    manifest entry for the ticker.
+    """
+    raw_df = download_raw_data(ticker)
+    df = build_features_and_labels(raw_df)
+
+    processed = processed_csv_path(ticker)
+    tmp = processed.with_suffix(".csv.tmp")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, processed)
+
+    return {
+        "raw_sha1": file_sha1(_raw_path(ticker)),
+        "params_hash": p_hash,
+        "processed_size": processed.stat().st_size,
+        "rows": int(len(df)),
+    }
+
+
+def run_pipeline(
+    tickers: List[str] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+    rebuild_store: bool = True,
+) -> Dict[str, object]:
+    """
+    Rebuild the processed files that are stale and update the manifest.
+    The manifest is saved after every finished ticker, so an interrupted run
+    keeps its progress.
+    """
+    if tickers is None:
+        tickers = config.TICKERS
+
+    params = labeling_params()
+    p_hash = params_hash(params)
+    manifest = load_manifest()
+    entries: Dict[str, Dict[str, object]] = manifest.setdefault("tickers", {})  # type: ignore[assignment]
+    manifest["params"] = params
+
+    todo = []
+    for t in tickers:
+        reason = "forced" if force else needs_rebuild(t, entries.get(t), p_hash)
+        if reason is not None:
+            print(f"{t}: rebuild ({reason})")
+            todo.append(t)
+
+    print(f"{len(todo)} of {len(tickers)} tickers need rebuilding")
+
+    failed: Dict[str, str] = {}
+    t0 = time.time()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_build_ticker, t, p_hash): t for t in todo}
+            for fut in as_completed(futures):
+                t = futures[fut]
+                try:
+                    entries[t] = fut.result()
+                    save_manifest(manifest)
+                    print(f"{t}: built {entries[t]['rows']} rows")
+                except Exception as e:
+                    failed[t] = repr(e)
+                    print(f"{t}: failed: {e!r}")
+
+    built = len(todo) - len(failed)
+    print(f"Built {built} tickers in {time.time() - t0:.1f}s ({len(failed)} failed)")
+    save_manifest(manifest)
+
+    if rebuild_store and built:
+        # Appends newly added tickers in place; rebuilds if any stored one
+        # changed. Always over the full ticker list: a --tickers subset only
+        # limits which CSVs are reprocessed, never what the store holds
+        update_feature_store(list(config.TICKERS) + [t for t in tickers if t not in config.TICKERS])
+
+    return {"built": built, "failed": failed, "skipped": len(tickers) - len(todo)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally rebuild data/processed.")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+    parser.add_argument("--force", action="store_true", help="Rebuild every ticker")
+    parser.add_argument("--tickers", nargs="*", default=None, help="Subset of tickers")
+    args = parser.parse_args()
+
+    run_pipeline(tickers=args.tickers, workers=args.workers, force=args.force)
@@ -0,0 +1,44 @@
+import os
+import resource
+import sys
+from typing import Dict
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Resident memory of this process in MB.
+
+    - rss_mb:    total resident set size
+    - shared_mb: resident pages backed by files (memory-mapped stores, shared
+                 libraries); these are shared with the other workers
+    - private_mb: rss_mb - shared_mb, what each extra worker really costs
+
+    Uses /proc/self/statm on Linux and falls back to peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            fields = f.read().split()
+        rss = int(fields[1]) * _PAGE_SIZE
+        shared = int(fields[2]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux/BSD
+        rss = peak if sys.platform == "darwin" else peak * 1024
+        shared = 0
+
+    mb = 1024 * 1024
+    return {
+        "rss_mb": rss / mb,
+        "shared_mb": shared / mb,
+        "private_mb": (rss - shared) / mb,
+    }
+
+
+def format_memory_usage() -> str:
+    mem = memory_usage()
+    return (
+        f"RSS {mem['rss_mb']:.1f} MB "
+        f"(shared {mem['shared_mb']:.1f} MB, private {mem['private_mb']:.1f} MB)"
+    )
@@ -1,27 +1,52 @@
-from typing import List
+from typing import List, Literal, Optional
 
+import asyncio
 import numpy as np
-import pandas as pd
 import json
-from fastapi import FastAPI, HTTPException
+import os
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pathlib import Path
 
 from app import config
-from app.data.load_data import load_or_build_all_data
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.data.panel import Panel, load_panel
+from app.breakdown import load_breakdown, summarize
+from app.cache import PREDICTION_CACHE, Fingerprint
+from app.diagnostics import format_memory_usage, memory_usage
 from app.models.classical import (
     get_random_forest_model,
     get_logreg_model,
     get_svm_model,
 )
-from app.models.quantum import (
-    quantum_vqc_predict,
-    quantum_qnn_predict,
-    MODELS_DIR,
+from app.models.backtest import BACKTEST_PATH
+from app.models.decision import DECISIONS, decision_names, probabilities_dict
+from app.models.prediction_table import PredictionTable, load_prediction_table
+from app.models.quantum import MODELS_DIR, quantum_score_batch
+from app.models.registry import (
+    CLASSICAL_MODEL_NAMES,
+    MODEL_ARTIFACTS,
+    QUANTUM_MODEL_NAMES,
+    model_version,
+    score_batch,
 )
+from app.models.simulator import adj_close, model_decisions, simulate
+from app.batcher import MicroBatcher
+from app.scheduler import SCHEDULER, Overloaded
+from app.telemetry import METRICS, RequestMetricsMiddleware, stage, timed_load
 from app.schemas import (
+    BatchModelPredictions,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    BacktestResponse,
+    BreakdownResponse,
     PredictionRequest,
     PredictionResponse,
+    SimulationResponse,
     MetricsResponse,
     ModelMetric,
 )
@@ -40,52 +65,243 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 
-DATA_DF: pd.DataFrame | None = None
-RF_MODEL = None
-LOGREG_MODEL = None
-SVM_MODEL = None
+FEATURE_INDEX: FeatureIndex | None = None
+
+# Dense date x ticker view of FEATURE_INDEX (app.data.panel): ticker listing,
+# date validation and batch row selection are slices of it. None when the
+# panel was not built for this index; FEATURE_INDEX answers those instead
+PANEL: Panel | None = None
 METRICS_PATH = MODELS_DIR / "metrics.json"
 
+# Precomputed predictions (app.models.prediction_table); None when there is
+# no table or it does not match FEATURE_INDEX
+PREDICTION_TABLE: PredictionTable | None = None
+
+# Upper bound on (ticker, date) rows per /api/predict/batch call
+MAX_BATCH_ROWS = 50_000
+
+# Classical models are loaded one at a time, on the first request that needs
+# them, so a worker only pays for the models it actually serves.
+_MODEL_LOADERS = {
+    "random_forest": get_random_forest_model,
+    "logreg": get_logreg_model,
+    "svm_linear": get_svm_model,
+}
+_MODELS: dict = {}
+_MODEL_VERSIONS: dict[str, Fingerprint] = {}
+_MODEL_LOCK = threading.Lock()
+
+# model name -> {"load_seconds", "rss_delta_mb", "private_delta_mb"}
+MODEL_LOAD_STATS: dict[str, dict[str, float]] = {}
+
+_DATA_LOCK = threading.Lock()
+
+# State of the background prewarm (config.PREWARM): "off", "pending",
+# "running" or "done", with its duration and per-model errors
+WARMUP: dict = {"state": "off", "seconds": None, "errors": {}}
+
 
-def ensure_data_and_models_loaded() -> None:
+def ensure_data_loaded() -> None:
     """
-    Lazy-load data and classical models if they haven't been loaded yet.
-    This makes the API robust even if the startup event didn't preload them.
+    Lazy-load the feature index (and the panel and prediction table built
+    for it) if they haven't been loaded yet. This makes the API robust even
+    if the startup event didn't preload them.
     """
-    global DATA_DF, RF_MODEL, LOGREG_MODEL, SVM_MODEL
+    global FEATURE_INDEX, PANEL, PREDICTION_TABLE
 
-    if DATA_DF is None:
-        print("Lazy-loading data...")
-        DATA_DF = load_or_build_all_data()
+    if FEATURE_INDEX is not None:
+        return
 
-    if RF_MODEL is None:
-        print("Lazy-loading Random Forest model...")
-        RF_MODEL = get_random_forest_model()
+    # The prewarm thread and early requests may get here at the same time
+    with _DATA_LOCK:
+        if FEATURE_INDEX is None:
+            print("Lazy-loading feature index...")
+            with timed_load("feature_index"):
+                index = load_feature_index()
+            with timed_load("panel"):
+                PANEL = load_panel(index)
+            with timed_load("prediction_table"):
+                PREDICTION_TABLE = load_prediction_table(index)
+            FEATURE_INDEX = index
 
-    if LOGREG_MODEL is None:
-        print("Lazy-loading Logistic Regression model...")
-        LOGREG_MODEL = get_logreg_model()
 
-    if SVM_MODEL is None:
-        print("Lazy-loading Linear SVM model...")
-        SVM_MODEL = get_svm_model()
+def get_model(model_name: str):
+    """
+    Return a classical model, loading it on first use (or again after its
+    artifacts changed on disk). Records how long the load took and how much
+    resident / private memory it added.
+    """
+    version = model_version(model_name)
+    model = _MODELS.get(model_name)
+    if model is not None and _MODEL_VERSIONS.get(model_name) == version:
+        return model
+
+    with _MODEL_LOCK:
+        model = _MODELS.get(model_name)
+        if model is None or _MODEL_VERSIONS.get(model_name) != version:
+            before = memory_usage()
+            t0 = time.perf_counter()
+            with timed_load(model_name):
+                model = _MODEL_LOADERS[model_name]()
+            seconds = time.perf_counter() - t0
+            after = memory_usage()
+
+            MODEL_LOAD_STATS[model_name] = {
+                "load_seconds": seconds,
+                "rss_delta_mb": after["rss_mb"] - before["rss_mb"],
+                "private_delta_mb": after["private_mb"] - before["private_mb"],
+            }
+            print(
+                f"Loaded {model_name} in {seconds:.3f}s "
+                f"(+{MODEL_LOAD_STATS[model_name]['rss_delta_mb']:.1f} MB RSS, "
+                f"+{MODEL_LOAD_STATS[model_name]['private_delta_mb']:.1f} MB private; "
+                f"pid {os.getpid()}): {format_memory_usage()}"
+            )
+            _MODELS[model_name] = model
+            _MODEL_VERSIONS[model_name] = version
+    return model
+
+
+def prewarm() -> None:
+    """
+    Load the data and every model, then score one row with each, so none of
+    that happens on a request's path. Runs in a background thread started by
+    the startup event when config.PREWARM is set; a model that fails to load
+    is recorded in WARMUP["errors"] and left to fail on its own requests.
+    """
+    WARMUP["state"] = "running"
+    t0 = time.perf_counter()
+    try:
+        ensure_data_loaded()
+    except Exception as e:
+        print(f"Prewarm could not load the feature index: {e!r}")
+        WARMUP["errors"]["data"] = repr(e)
+    else:
+        # Through the scheduler, so its pools (and worker processes) start too
+        x = FEATURE_INDEX.feature_row(0)  # type: ignore[union-attr]
+        for model_name in CLASSICAL_MODEL_NAMES + QUANTUM_MODEL_NAMES:
+            try:
+                with timed_load(f"prewarm_{model_name}"):
+                    SCHEDULER.submit(model_name, *_batch_job(model_name), x).result()
+            except Exception as e:
+                print(f"Prewarm could not load {model_name}: {e!r}")
+                WARMUP["errors"][model_name] = repr(e)
+
+    WARMUP["seconds"] = time.perf_counter() - t0
+    WARMUP["state"] = "done"
+    print(
+        f"Prewarm done in {WARMUP['seconds']:.2f}s "
+        f"(pid {os.getpid()}): {format_memory_usage()}"
+    )
+
+
+def is_ready() -> bool:
+    """
+    Ready to serve without loading anything first: the data is loaded and
+    the prewarm (if enabled) has finished.
+    """
+    return FEATURE_INDEX is not None and WARMUP["state"] in ("off", "done")
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     """
-    Don't load anything at startup to save memory.
-    Models will be loaded on first request via ensure_data_and_models_loaded().
+    Map the feature index and prediction table at startup: with a compiled
+    feature store both are read-only memory maps shared by all workers, so
+    they cost almost no private memory. Each classical model is loaded on the
+    first request that uses it via get_model().
+
+    With config.PREWARM, all of that (and every model) is loaded by prewarm()
+    in a background thread instead, so the server starts answering (and
+    reports live, not yet ready, on /api/health) right away.
     """
-    print("Startup event: Skipping preload to conserve memory.")
-    print("Models and data will be loaded on first API request.")
+    print(f"Startup event (pid {os.getpid()}): {format_memory_usage()}")
+    if config.PREWARM:
+        WARMUP["state"] = "pending"
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+        return
+
+    try:
+        ensure_data_loaded()
+    except Exception as e:
+        # Keep the server up; the first request will retry and surface the error
+        print(f"Could not load feature index at startup: {e!r}")
+    print(f"Startup complete (pid {os.getpid()}): {format_memory_usage()}")
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    SCHEDULER.shutdown()
 
 
 @app.get("/api/health")
 def health():
-    return {"status": "ok"}
+    """
+    Liveness: always 200 while the process serves requests. "ready" says
+    whether the data and models are loaded (see /api/health/ready).
+    """
+    return {"status": "ok", "ready": is_ready(), "warmup": WARMUP}
+
+
+@app.get("/api/health/ready")
+def readiness():
+    """
+    Readiness probe: 200 once is_ready(), 503 before. Does not trigger any
+    loading itself.
+    """
+    ready = is_ready()
+    return JSONResponse(
+        {"ready": ready, "warmup": WARMUP},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/api/models")
+def list_loaded_models():
+    """
+    Which classical models this worker has loaded, with their load time and
+    memory cost, plus the worker's current memory usage.
+    """
+    return {
+        "pid": os.getpid(),
+        "loaded": MODEL_LOAD_STATS,
+        "memory": memory_usage(),
+    }
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """
+    Hit / miss / eviction counters of this worker's /api/predict cache.
+    """
+    return PREDICTION_CACHE.stats()
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    This worker's request counters, latency histograms per endpoint / stage /
+    model (app.telemetry), prediction cache stats, loaded models and memory,
+    in the Prometheus text format.
+    """
+    cache = PREDICTION_CACHE.stats()
+    depths = SCHEDULER.depths()
+    mem = memory_usage()
+    mb = 1024 * 1024
+    gauges = {
+        **{f"prediction_cache_{k}": {(): float(v)} for k, v in cache.items()},
+        "process_resident_memory_bytes": {(): mem["rss_mb"] * mb},
+        "process_shared_memory_bytes": {(): mem["shared_mb"] * mb},
+        "process_private_memory_bytes": {(): mem["private_mb"] * mb},
+        "model_loaded": {(("model", name),): 1.0 for name in _MODELS},
+        "inference_running": {(("model", name),): float(r) for name, (r, _) in depths.items()},
+        "inference_queue_depth": {(("model", name),): float(w) for name, (_, w) in depths.items()},
+        "ready": {(): float(is_ready())},
+    }
+    return PlainTextResponse(METRICS.render(gauges), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/model-metrics", response_model=MetricsResponse)
 def get_model_metrics():
@@ -121,86 +337,309 @@ def get_model_metrics():
 
     return MetricsResponse(metrics=metrics_list)
 
+
+@app.get("/api/model-metrics/breakdown", response_model=BreakdownResponse)
+def get_model_metrics_breakdown(
+    by: Literal["ticker", "month"] = "ticker",
+    tickers: Optional[List[str]] = Query(None),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    model_names: Optional[List[str]] = Query(None),
+):
+    """
+    Accuracy, agreement with RF, confusion matrix and label distribution per
+    ticker or per month, optionally restricted to some tickers, models and a
+    date range (whole months overlapping it).
+    """
+    data = load_breakdown()
+    if data is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Metrics breakdown not found. Run evaluate_models.py first.",
+        )
+
+    return BreakdownResponse(
+        by=by,
+        models=summarize(data, by, tickers, start_date, end_date, model_names),
+    )
+
+@app.get("/api/backtest", response_model=BacktestResponse)
+def get_backtest(
+    model_names: Optional[List[str]] = Query(None),
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+):
+    """
+    Month-by-month walk-forward results (python -m app.models.backtest),
+    optionally for some models and a range of test months ("YYYY-MM").
+    """
+    if not BACKTEST_PATH.exists():
+        raise HTTPException(
+            status_code=404,
+            detail="Backtest results not found. Run python -m app.models.backtest first.",
+        )
+
+    try:
+        raw = json.load(BACKTEST_PATH.open("r"))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read backtest.json: {e!r}",
+        )
+
+    models = {
+        name: [
+            p for p in points
+            if (start_month is None or p["month"] >= start_month)
+            and (end_month is None or p["month"] <= end_month)
+        ]
+        for name, points in raw["models"].items()
+        if model_names is None or name in model_names
+    }
+    return BacktestResponse(params=raw["params"], models=models)
+
 @app.get("/api/tickers")
 def list_tickers() -> List[str]:
-    ensure_data_and_models_loaded()
-    # DATA_DF is guaranteed non-None after ensure_data_and_models_loaded()
-    return sorted(DATA_DF["ticker"].unique().tolist())  # type: ignore[union-attr]
+    ensure_data_loaded()
+    # FEATURE_INDEX is guaranteed non-None after ensure_data_loaded()
+    view = PANEL if PANEL is not None else FEATURE_INDEX
+    return view.listed_tickers()  # type: ignore[union-attr]
 
 
-def _predict_with_hold_threshold(model, X: np.ndarray, hold_threshold: float = 0.6):
+def _classical_score_batch(model_name: str, X: np.ndarray):
+    return score_batch(model_name, get_model(model_name), X)
+
+
+def _batch_job(model_name: str):
     """
-    Shared logic for classical models:
-    - Get class probabilities via predict_proba
-    - Apply HOLD-threshold rule to reduce HOLD bias
+    (fn, *args) that scores a matrix X with a model when called as
+    fn(*args, X): what SCHEDULER runs for live predictions. The quantum one
+    avoids the registry so worker processes do not import sklearn.
     """
-    proba = model.predict_proba(X)[0]
-    classes = model.classes_
-    prob_map = {cls: float(p) for cls, p in zip(classes, proba)}
+    if model_name in CLASSICAL_MODEL_NAMES:
+        return _classical_score_batch, model_name
+    return quantum_score_batch, model_name
 
-    p_buy = prob_map.get("BUY", 0.0)
-    p_hold = prob_map.get("HOLD", 0.0)
-    p_sell = prob_map.get("SELL", 0.0)
 
-    if (
-        p_hold >= hold_threshold
-        and p_hold >= p_buy
-        and p_hold >= p_sell
-    ):
-        decision = "HOLD"
-    else:
-        decision = "BUY" if p_buy >= p_sell else "SELL"
+# Coalesce concurrent live /api/predict rows per model (app.batcher)
+BATCHERS = {name: MicroBatcher(name, *_batch_job(name)) for name in MODEL_ARTIFACTS}
+
 
-    return decision, prob_map
+def _submit(model_name: str, fn, *args):
+    """
+    SCHEDULER.submit, with a full queue turned into 429 Too Many Requests.
+    """
+    try:
+        return SCHEDULER.submit(model_name, fn, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+
+def _missing_row_detail(ticker: str, date: str) -> str:
+    """
+    Why (ticker, date) has no row: unknown ticker, a date outside the
+    trading calendar, or a day this ticker has no data for.
+    """
+    view = PANEL if PANEL is not None else FEATURE_INDEX
+    if view is None:
+        return "No data for that ticker/date (might be a weekend/holiday)."
+    if ticker not in view.ticker_pos:
+        return f"Unknown ticker: {ticker}"
+    if date not in view.date_pos:
+        if not view.dates or not view.dates[0] <= date <= view.dates[-1]:
+            return f"Date {date} is outside the data range {view.dates[0]} .. {view.dates[-1]}."
+        return f"{date} is not a trading day (weekend/holiday)."
+    return f"No data for {ticker} on {date} (not listed yet or missing day)."
 
 
 @app.post("/api/predict", response_model=PredictionResponse)
-def predict(req: PredictionRequest):
-    ensure_data_and_models_loaded()
+async def predict(req: PredictionRequest):
+    """
+    Runs on the event loop: cache and prediction table hits are answered
+    directly, and live scoring is awaited from SCHEDULER, so requests
+    waiting for a busy model do not hold a server thread.
+    """
+    if FEATURE_INDEX is None:
+        await run_in_threadpool(ensure_data_loaded)
 
-    df = DATA_DF  # type: ignore[assignment]
-    if df is None:
+    index = FEATURE_INDEX
+    if index is None:
         raise HTTPException(status_code=500, detail="Data not loaded")
 
-    # Filter for specific ticker and date
-    row = df[(df["ticker"] == req.ticker) & (df["Date"] == req.date)]
-    if row.empty:
+    if req.model_name not in MODEL_ARTIFACTS:
         raise HTTPException(
-            status_code=404,
-            detail="No data for that ticker/date (might be a weekend/holiday).",
+            status_code=400,
+            detail=f"Unknown model_name: {req.model_name}",
+        )
+
+    endpoint, model_name = "/api/predict", req.model_name
+
+    with stage(endpoint, "cache", model_name):
+        version = model_version(model_name)
+        cache_key = (model_name, req.ticker, req.date, version)
+        cached = PREDICTION_CACHE.get(cache_key)
+    if cached is not None:
+        decision, probs = cached
+        with stage(endpoint, "response", model_name):
+            return PredictionResponse(
+                ticker=req.ticker,
+                date=req.date,
+                model_name=model_name,
+                decision=decision,
+                probabilities=probs,
+            )
+
+    # O(1) lookup of the row for this ticker and date
+    with stage(endpoint, "lookup", model_name):
+        row = index.lookup(req.ticker, req.date)
+    if row is None:
+        raise HTTPException(status_code=404, detail=_missing_row_detail(req.ticker, req.date))
+
+    # Precomputed answer, if the table is current for this model
+    with stage(endpoint, "table", model_name):
+        table = PREDICTION_TABLE
+        hit = table.lookup(model_name, row, version) if table is not None else None
+
+    # Extract features (1, n_features) float64 view, no pandas involved
+    X = index.feature_row(row)
+
+    if hit is not None:
+        decision, probs = hit
+    else:
+        # Batching wait, queue wait, model load (classical) and scoring in
+        # the model's pool
+        with stage(endpoint, "inference", model_name):
+            if config.MICROBATCH_MAX_ROWS > 1:
+                try:
+                    decision, probs = await BATCHERS[model_name].predict(X)
+                except Overloaded as e:
+                    raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+            else:
+                future = _submit(model_name, *_batch_job(model_name), X)
+                codes, P = await asyncio.wrap_future(future)
+                decision, probs = str(decision_names(codes)[0]), probabilities_dict(P[0])
+
+    with stage(endpoint, "response", model_name):
+        PREDICTION_CACHE.put(cache_key, (decision, probs))
+        return PredictionResponse(
+            ticker=req.ticker,
+            date=req.date,
+            model_name=model_name,
+            decision=decision,
+            probabilities=probs,
         )
 
-    # Extract features
-    X = row[config.FEATURE_COLS].values.astype(float)
 
-    # Dispatch based on model_name
-    if req.model_name == "random_forest":
-        decision, probs = _predict_with_hold_threshold(RF_MODEL, X)
+@app.get("/api/simulate", response_model=SimulationResponse)
+def simulate_strategy(
+    model_name: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tickers: Optional[List[str]] = Query(None),
+    cost_bps: float = 0.0,
+):
+    """
+    P&L of trading a model's decisions with the LABEL_HORIZON_DAYS hold rule
+    (app.models.simulator), per ticker and for an equal-weight portfolio.
+    """
+    if model_name not in MODEL_ARTIFACTS:
+        raise HTTPException(status_code=400, detail=f"Unknown model_name: {model_name}")
+
+    ensure_data_loaded()
+    index = FEATURE_INDEX
+    if index is None:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+
+    model = get_model(model_name) if model_name in CLASSICAL_MODEL_NAMES else None
+    codes = model_decisions(model_name, index, PREDICTION_TABLE, model=model)
 
-    elif req.model_name == "logreg":
-        decision, probs = _predict_with_hold_threshold(LOGREG_MODEL, X)
+    try:
+        result = simulate(
+            index,
+            adj_close(index),
+            codes,
+            start_date=start_date,
+            end_date=end_date,
+            tickers=tickers,
+            cost_bps=cost_bps,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    elif req.model_name == "svm_linear":
-        decision, probs = _predict_with_hold_threshold(SVM_MODEL, X)
+    return SimulationResponse(model_name=model_name, **result)
 
-    elif req.model_name == "quantum_vqc":
-        probs = quantum_vqc_predict(X)
-        decision = max(probs, key=probs.get)
 
-    elif req.model_name == "quantum_qnn":
-        probs = quantum_qnn_predict(X)
-        decision = max(probs, key=probs.get)
+@app.post("/api/predict/batch", response_model=BatchPredictionResponse)
+def predict_batch(req: BatchPredictionRequest):
+    """
+    Score many (ticker, date) rows with several models in one call.
 
+    All matching feature rows are gathered into one matrix and every model
+    is evaluated once on it.
+    """
+    unknown = [
+        m for m in req.model_names
+        if m not in CLASSICAL_MODEL_NAMES and m not in QUANTUM_MODEL_NAMES
+    ]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown model_name(s): {unknown}")
+
+    if req.date is not None:
+        start_date = end_date = req.date
+    elif req.start_date is not None and req.end_date is not None:
+        start_date, end_date = req.start_date, req.end_date
     else:
         raise HTTPException(
             status_code=400,
-            detail=f"Unknown model_name: {req.model_name}",
+            detail="Provide either 'date' or both 'start_date' and 'end_date'.",
         )
 
-    return PredictionResponse(
-        ticker=req.ticker,
-        date=req.date,
-        model_name=req.model_name,
-        decision=decision,
-        probabilities=probs,
-    )
\ No newline at end of file
+    ensure_data_loaded()
+
+    index, panel = FEATURE_INDEX, PANEL
+    if index is None:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    select = panel.select if panel is not None else index.select_rows
+
+    endpoint = "/api/predict/batch"
+    with stage(endpoint, "select"):
+        rows, ticker_codes, date_codes = select(req.tickers, start_date, end_date)
+    if rows.size == 0:
+        raise HTTPException(
+            status_code=404,
+            detail="No data for those tickers/dates (might be weekends/holidays).",
+        )
+    if rows.size > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch matches {rows.size} rows; the limit is {MAX_BATCH_ROWS}.",
+        )
+
+    X = None
+    table = PREDICTION_TABLE
+
+    predictions: dict[str, BatchModelPredictions] = {}
+    for model_name in dict.fromkeys(req.model_names):
+        with stage(endpoint, "table", model_name):
+            hit = table.rows(model_name, rows, model_version(model_name)) if table is not None else None
+        if hit is not None:
+            codes, P = hit
+        else:
+            if X is None:
+                # float64 rows from the index, as the models were trained on
+                X = index.feature_rows(rows)
+            with stage(endpoint, "inference", model_name):
+                codes, P = _submit(model_name, *_batch_job(model_name), X).result()
+
+        with stage(endpoint, "response", model_name):
+            predictions[model_name] = BatchModelPredictions(
+                decisions=decision_names(codes).tolist(),
+                probabilities={d: P[:, j].tolist() for j, d in enumerate(DECISIONS)},
+            )
+
+    with stage(endpoint, "response"):
+        return BatchPredictionResponse(
+            tickers=[index.tickers[t] for t in ticker_codes.tolist()],
+            dates=[index.dates[d] for d in date_codes.tolist()],
+            predictions=predictions,
+        )
@@ -0,0 +1,313 @@
+"""
+Walk-forward backtest: train on the past, test on the next month, slide.
+
+For every test month between start_month and end_month (default March 2018
+to January 2020, the range in the README) each model is trained only on
+rows dated before that month and scored on the month itself:
+
+    train: [test_start - train_months, test_start - embargo)   test: one month
+
+The embargo drops the last LABEL_HORIZON_DAYS trading days before the test
+month, whose labels look into it. With refit_every=k a model is refit on
+the first month of every block of k months and reused for the rest.
+classical.train_all_classical() still uses a shuffled split for the served
+models; this is the leak-free way to judge them over time.
+
+Fits run in a process pool. Each fitted window model is saved under
+models/backtest_cache/ keyed by model, training date range, hyperparameters
+and dataset fingerprint, so rerunning an overlapping range only fits the
+new windows. Quantum models have no per-window training; they are scored
+with their current weights on every test month.
+
+Results go to models/backtest.json (served by /api/backtest):
+
+    python -m app.models.backtest [--models logreg svm_linear] [--start 2018-03]
+        [--end 2020-01] [--train-months 36] [--refit-every 1] [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app import config
+from app.breakdown import month_codes
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.data.feature_store import LABELS
+from app.models.classical import MODELS_DIR, _build_classifier, _fit_classifier
+from app.models.decision import DECISIONS, predict_with_hold_threshold
+from app.models.registry import MODEL_NAMES, QUANTUM_MODEL_NAMES, score_batch
+from app.workers import init_worker_state
+
+BACKTEST_PATH = MODELS_DIR / "backtest.json"
+BACKTEST_CACHE_DIR = MODELS_DIR / "backtest_cache"
+
+DEFAULT_BACKTEST_MODELS = ["logreg", "svm_linear", "random_forest"]
+DEFAULT_START_MONTH = "2018-03"
+DEFAULT_END_MONTH = "2020-01"
+
+# Filled by _init_worker (app.workers): the walk-forward view of the index
+_WORKER: Dict[str, Any] = {}
+
+
+class WalkForward:
+    """
+    Time-sorted view of a FeatureIndex: rows ordered by date, so any date
+    range is one contiguous slice found with searchsorted.
+    """
+
+    def __init__(self, index: FeatureIndex):
+        self.index = index
+        _, date_codes = index.row_coordinates()
+        self.months, self.date_month = month_codes(index.dates)
+
+        mapped = np.flatnonzero(date_codes >= 0)
+        order = np.argsort(date_codes[mapped], kind="stable")
+        self.rows = mapped[order]
+        self.row_dates = date_codes[self.rows]
+
+    def month_start(self, month: str) -> int:
+        """
+        Date code of the first trading day in `month`.
+        """
+        return int(np.searchsorted(self.date_month, self.months.index(month)))
+
+    def rows_between(self, date_lo: int, date_hi: int) -> np.ndarray:
+        """
+        Rows with date_lo <= date code < date_hi, in date order.
+        """
+        lo = np.searchsorted(self.row_dates, date_lo, side="left")
+        hi = np.searchsorted(self.row_dates, date_hi, side="left")
+        return self.rows[lo:hi]
+
+
+def plan_windows(
+    wf: WalkForward,
+    start_month: str,
+    end_month: str,
+    train_months: Optional[int],
+    embargo_days: int,
+) -> List[Dict[str, Any]]:
+    """
+    One window per test month: test date range and the (embargoed) training
+    date range, as date codes into index.dates.
+    """
+    test_months = [m for m in wf.months if start_month <= m <= end_month]
+    windows = []
+    for month in test_months:
+        m = wf.months.index(month)
+        test_lo = wf.month_start(month)
+        test_hi = wf.month_start(wf.months[m + 1]) if m + 1 < len(wf.months) else len(wf.index.dates)
+
+        train_lo = 0
+        if train_months is not None:
+            train_lo = wf.month_start(wf.months[max(0, m - train_months)])
+        train_hi = test_lo - embargo_days
+        if train_hi <= train_lo:
+            print(f"Skipping {month}: no training data before it")
+            continue
+
+        windows.append(
+            {
+                "month": month,
+                "train": (train_lo, train_hi),
+                "test": (test_lo, test_hi),
+            }
+        )
+    return windows
+
+
+def _cache_key(model_name: str, train: Tuple[int, int], dates: List[str], fingerprint: str) -> str:
+    clf = _build_classifier(model_name, n_jobs=1)
+    spec = {
+        "model": model_name,
+        "train_first": dates[train[0]],
+        "train_last": dates[train[1] - 1],
+        "params": repr(sorted(clf.get_params().items())),
+        "index": fingerprint,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _init_worker() -> None:
+    init_worker_state(_WORKER)
+    _WORKER["wf"] = WalkForward(load_feature_index())
+
+
+def _fit_or_load(model_name: str, train: Tuple[int, int]) -> Tuple[Pipeline, float, bool]:
+    """
+    The window model for `train`, from the cache or freshly fitted (and
+    cached). Returns (pipeline, fit seconds, cache hit).
+    """
+    wf: WalkForward = _WORKER["wf"]
+    index = wf.index
+    path = BACKTEST_CACHE_DIR / model_name / (
+        _cache_key(model_name, train, index.dates, index.fingerprint()) + ".joblib"
+    )
+    if path.exists():
+        return joblib.load(path), 0.0, True
+
+    rows = wf.rows_between(*train)
+    y = np.asarray(index.label_codes[rows])
+    rows = rows[y >= 0]
+    X = index.feature_rows(rows)
+    y = np.asarray(LABELS)[np.asarray(index.label_codes[rows])]
+
+    t0 = time.perf_counter()
+    scaler = StandardScaler().fit(X)
+    clf = _fit_classifier(model_name, _build_classifier(model_name, n_jobs=1), scaler.transform(X), y, {})
+    seconds = time.perf_counter() - t0
+
+    pipeline = Pipeline(steps=[("scaler", scaler), ("clf", clf)])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, path)
+    return pipeline, seconds, False
+
+
+def _run_block(model_name: str, windows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Worker: fit (or load) one model on the first window's training range and
+    score every window of the block with it.
+    """
+    wf: WalkForward = _WORKER["wf"]
+    index = wf.index
+
+    model, fit_seconds, cached, train_rows = None, 0.0, False, 0
+    if model_name not in QUANTUM_MODEL_NAMES:
+        model, fit_seconds, cached = _fit_or_load(model_name, windows[0]["train"])
+        # Rows the model was fitted on: unlabeled ones are dropped
+        train = wf.rows_between(*windows[0]["train"])
+        train_rows = int(np.count_nonzero(np.asarray(index.label_codes[train]) >= 0))
+
+    results = []
+    for w in windows:
+        rows = wf.rows_between(*w["test"])
+        X = index.feature_rows(rows)
+        if model is None:
+            codes, _ = score_batch(model_name, None, X)
+        else:
+            codes, _ = predict_with_hold_threshold(model, X)
+
+        y_true = np.asarray(index.label_codes[rows]).astype(np.int64)
+        labeled = y_true >= 0
+        confusion = np.bincount(
+            y_true[labeled] * len(DECISIONS) + codes[labeled],
+            minlength=len(DECISIONS) ** 2,
+        ).reshape(len(DECISIONS), len(DECISIONS))
+
+        results.append(
+            {
+                "month": w["month"],
+                "train_start": index.dates[w["train"][0]],
+                "train_end": index.dates[w["train"][1] - 1],
+                "n_train": train_rows,
+                "n_test": int(rows.size),
+                "accuracy": float(np.trace(confusion) / confusion.sum()) if confusion.sum() else None,
+                "confusion_matrix": confusion.tolist(),
+                "decision_distribution": dict(
+                    zip(DECISIONS, np.bincount(codes, minlength=len(DECISIONS)).tolist())
+                ),
+                "fit_seconds": fit_seconds if w is windows[0] else 0.0,
+                "cached": cached,
+            }
+        )
+    return results
+
+
+def run_backtest(
+    model_names: List[str] = None,
+    start_month: str = DEFAULT_START_MONTH,
+    end_month: str = DEFAULT_END_MONTH,
+    train_months: Optional[int] = None,
+    refit_every: int = 1,
+    embargo_days: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run the walk-forward backtest and write BACKTEST_PATH.
+
+    train_months=None trains on everything before the test month (expanding
+    window); otherwise only on the last train_months months.
+    """
+    if model_names is None:
+        model_names = DEFAULT_BACKTEST_MODELS
+    if embargo_days is None:
+        embargo_days = config.LABEL_HORIZON_DAYS
+
+    wf = WalkForward(load_feature_index())
+    windows = plan_windows(wf, start_month, end_month, train_months, embargo_days)
+    if not windows:
+        raise ValueError(f"No data between {start_month} and {end_month}")
+
+    # Window blocks that share one fitted model
+    blocks = [windows[i : i + refit_every] for i in range(0, len(windows), refit_every)]
+    jobs = [(name, block) for name in model_names for block in blocks]
+    print(
+        f"Walk-forward over {len(windows)} months ({windows[0]['month']} .. "
+        f"{windows[-1]['month']}), {len(blocks)} fits per model, {len(model_names)} models"
+    )
+
+    per_model: Dict[str, List[Dict[str, Any]]] = {name: [] for name in model_names}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_block, name, block): (name, block) for name, block in jobs}
+        for fut in as_completed(futures):
+            name, block = futures[fut]
+            per_model[name].extend(fut.result())
+            print(f"{name} {block[0]['month']}..{block[-1]['month']} done")
+    seconds = time.perf_counter() - t0
+
+    for name, points in per_model.items():
+        points.sort(key=lambda p: p["month"])
+        fitted = sum(1 for p in points if p["fit_seconds"] > 0)
+        print(f"{name}: {fitted} windows fitted, {sum(p['cached'] for p in points)} month(s) from cache")
+
+    report = {
+        "params": {
+            "start_month": windows[0]["month"],
+            "end_month": windows[-1]["month"],
+            "train_months": train_months,
+            "refit_every": refit_every,
+            "embargo_days": embargo_days,
+        },
+        "seconds": seconds,
+        "models": per_model,
+    }
+    with BACKTEST_PATH.open("w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Backtest finished in {seconds:.1f}s; saved to {BACKTEST_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest by month.")
+    parser.add_argument("--models", nargs="*", default=DEFAULT_BACKTEST_MODELS, choices=MODEL_NAMES)
+    parser.add_argument("--start", default=DEFAULT_START_MONTH, help="First test month, YYYY-MM")
+    parser.add_argument("--end", default=DEFAULT_END_MONTH, help="Last test month, YYYY-MM")
+    parser.add_argument(
+        "--train-months", type=int, default=None, help="Rolling training window (default: expanding)"
+    )
+    parser.add_argument("--refit-every", type=int, default=1, help="Months each fitted model is reused for")
+    parser.add_argument("--embargo-days", type=int, default=None, help="Default: LABEL_HORIZON_DAYS")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    run_backtest(
+        model_names=args.models,
+        start_month=args.start,
+        end_month=args.end,
+        train_months=args.train_months,
+        refit_every=args.refit_every,
+        embargo_days=args.embargo_days,
+        workers=args.workers,
+    )
@@ -1,16 +1,23 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 import joblib
 import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.frozen import FrozenEstimator
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
-from sklearn.svm import SVC
+from sklearn.svm import SVC, LinearSVC
+from threadpoolctl import threadpool_limits
 
-from app import config
-from app.data.load_data import load_or_build_all_data
+from app.data.feature_index import load_feature_index
+from app.data.feature_store import LABELS
 
 # Project root: .../stock-quantum-project
 ROOT_DIR = Path(__file__).resolve().parents[3]
@@ -20,15 +27,39 @@ MODELS_DIR.mkdir(parents=True, exist_ok=True)
 RF_MODEL_PATH = MODELS_DIR / "random_forest.pkl"
 LOGREG_MODEL_PATH = MODELS_DIR / "logreg.pkl"
 SVM_MODEL_PATH = MODELS_DIR / "svm_linear.pkl"
+# Previous libsvm SVC(probability=True) engine, only trained on request so
+# evaluate_models.py can compare it side by side with svm_linear
+SVM_SVC_MODEL_PATH = MODELS_DIR / "svm_linear_svc.pkl"
 
+# Share of the training rows held out to calibrate the linear SVM
+SVM_CALIBRATION_FRACTION = 0.1
 
-def _train_test_split(df):
-    X = df[config.FEATURE_COLS].values
-    y = df["label"].values
 
+CLASSICAL_MODEL_PATHS: Dict[str, Path] = {
+    "random_forest": RF_MODEL_PATH,
+    "logreg": LOGREG_MODEL_PATH,
+    "svm_linear": SVM_MODEL_PATH,
+    "svm_linear_svc": SVM_SVC_MODEL_PATH,
+}
+
+CLASSICAL_MODEL_LABELS: Dict[str, str] = {
+    "random_forest": "Random Forest",
+    "logreg": "Logistic Regression",
+    "svm_linear": "Linear SVM",
+    "svm_linear_svc": "Linear SVM (libsvm SVC)",
+}
+
+# Models trained by default; svm_linear_svc is opt-in because it is slow
+DEFAULT_CLASSICAL_MODELS: List[str] = ["random_forest", "logreg", "svm_linear"]
+
+
+def _train_test_split(n_rows: int, y: np.ndarray):
+    """
+    Split row numbers rather than a materialized feature matrix; yields the
+    same split as splitting (X, y) directly.
+    """
     return train_test_split(
-        X,
-        y,
+        np.arange(n_rows),
         test_size=0.2,
         shuffle=True,
         stratify=y,
@@ -36,109 +67,269 @@ def _train_test_split(df):
     )
 
 
-def train_and_save_random_forest() -> None:
+def _build_classifier(name: str, n_jobs: int):
     """
-    Train a RandomForest classifier on the full (imbalanced) dataset and save it.
+    Unfitted classifier for one of CLASSICAL_MODEL_PATHS. The scaler is
+    fitted once and shared, so only the classifier is built here.
     """
-    print("Loading data for training (Random Forest)...")
-    df = load_or_build_all_data()
+    if name == "random_forest":
+        # Full (imbalanced) dataset
+        return RandomForestClassifier(
+            n_estimators=200,
+            random_state=42,
+            n_jobs=n_jobs,
+        )
+    if name == "logreg":
+        # lbfgs fits a multinomial model for multiclass targets by default
+        # (the multi_class argument was removed in newer scikit-learn)
+        return LogisticRegression(
+            max_iter=1000,
+            n_jobs=n_jobs,
+            random_state=42,
+        )
+    if name == "svm_linear":
+        # Primal liblinear solver: scales linearly in the number of rows.
+        # Probabilities come from a separate calibration stage, see
+        # _fit_classifier.
+        return LinearSVC(
+            dual=False,
+            random_state=42,
+        )
+    if name == "svm_linear_svc":
+        return SVC(
+            kernel="linear",
+            probability=True,  # internal 5-fold Platt scaling for predict_proba
+            random_state=42,
+        )
+    raise ValueError(f"Unknown classical model: {name}")
 
-    print("Label distribution:")
-    print(df["label"].value_counts())
-    print("Label distribution (normalized):")
-    print(df["label"].value_counts(normalize=True))
-
-    X_train, X_test, y_train, y_test = _train_test_split(df)
-
-    pipeline = Pipeline(
-        steps=[
-            ("scaler", StandardScaler()),
-            ("clf", RandomForestClassifier(
-                n_estimators=200,
-                random_state=42,
-                n_jobs=-1,
-            )),
-        ]
+
+def _fit_classifier(name: str, clf, X, y, timings: Dict[str, float]):
+    """
+    Fit `clf` and return the estimator to save.
+
+    The linear SVM is fitted on most of the training rows and then wrapped in
+    a sigmoid (Platt) calibrator fitted on the held-out rest, so it exposes
+    predict_proba for the HOLD-threshold rule at the cost of one cheap
+    extra fit instead of libsvm's internal 5-fold calibration.
+    """
+    if name != "svm_linear":
+        t0 = time.perf_counter()
+        clf.fit(X, y)
+        timings["fit"] = time.perf_counter() - t0
+        return clf
+
+    X_fit, X_cal, y_fit, y_cal = train_test_split(
+        X,
+        y,
+        test_size=SVM_CALIBRATION_FRACTION,
+        shuffle=True,
+        stratify=y,
+        random_state=42,
     )
 
-    print("Training Random Forest...")
-    pipeline.fit(X_train, y_train)
+    t0 = time.perf_counter()
+    clf.fit(X_fit, y_fit)
+    timings["fit"] = time.perf_counter() - t0
 
-    acc = pipeline.score(X_test, y_test)
-    print(f"Random Forest accuracy on held-out data: {acc:.3f}")
+    t0 = time.perf_counter()
+    calibrated = CalibratedClassifierCV(FrozenEstimator(clf), method="sigmoid")
+    calibrated.fit(X_cal, y_cal)
+    timings["calibrate"] = time.perf_counter() - t0
+    return calibrated
 
-    joblib.dump(pipeline, RF_MODEL_PATH)
-    print(f"Saved Random Forest model to {RF_MODEL_PATH}")
 
+def prepare_training_data() -> Dict[str, Any]:
+    """
+    Load, split and scale the dataset once for all classical models.
 
-def train_and_save_logreg() -> None:
+    Features and labels come from the feature index (memory maps of the
+    compiled store) instead of the full dataframe; only the rows of each
+    split are copied into memory.
+
+    Returns the fitted StandardScaler, the scaled train/test matrices, the
+    labels, and the time spent in each shared phase.
     """
-    Train a multinomial Logistic Regression classifier and save it.
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    index = load_feature_index()
+    y = np.asarray(LABELS, dtype=object)[np.asarray(index.label_codes)]
+    timings["load"] = time.perf_counter() - t0
+
+    counts = {label: int((y == label).sum()) for label in LABELS}
+    print("Label distribution:")
+    for label, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+        print(f"  {label:5s} {n:8d}  ({n / len(y):.6f})")
+
+    t0 = time.perf_counter()
+    train_rows, test_rows = _train_test_split(len(index), y)
+    X_train, y_train = index.feature_rows(train_rows), y[train_rows]
+    X_test, y_test = index.feature_rows(test_rows), y[test_rows]
+    timings["split"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scaler = StandardScaler().fit(X_train)
+    X_train_s = scaler.transform(X_train)
+    X_test_s = scaler.transform(X_test)
+    timings["scale"] = time.perf_counter() - t0
+
+    return {
+        "scaler": scaler,
+        "X_train": X_train_s,
+        "X_test": X_test_s,
+        "y_train": y_train,
+        "y_test": y_test,
+        "timings": timings,
+    }
+
+
+def _fit_score_save(name: str, data: Dict[str, Any], n_jobs: int) -> Dict[str, Any]:
     """
-    print("Loading data for training (Logistic Regression)...")
-    df = load_or_build_all_data()
-
-    X_train, X_test, y_train, y_test = _train_test_split(df)
-
-    pipeline = Pipeline(
-        steps=[
-            ("scaler", StandardScaler()),
-            ("clf", LogisticRegression(
-                multi_class="multinomial",
-                max_iter=1000,
-                n_jobs=-1,
-                random_state=42,
-            )),
-        ]
-    )
+    Fit one classifier on the shared scaled matrices, score it and save it
+    as a scaler + classifier Pipeline (what the API and evaluator load).
+    Runs inside a worker process when training concurrently.
+    """
+    timings: Dict[str, float] = {}
+    label = CLASSICAL_MODEL_LABELS[name]
 
-    print("Training Logistic Regression...")
-    pipeline.fit(X_train, y_train)
+    # Keep BLAS/OpenMP inside this model's CPU budget
+    with threadpool_limits(limits=n_jobs):
+        clf = _build_classifier(name, n_jobs=n_jobs)
 
-    acc = pipeline.score(X_test, y_test)
-    print(f"Logistic Regression accuracy on held-out data: {acc:.3f}")
+        print(f"Training {label} ({n_jobs} CPU)...")
+        clf = _fit_classifier(name, clf, data["X_train"], data["y_train"], timings)
 
-    joblib.dump(pipeline, LOGREG_MODEL_PATH)
-    print(f"Saved Logistic Regression model to {LOGREG_MODEL_PATH}")
+        t0 = time.perf_counter()
+        acc = clf.score(data["X_test"], data["y_test"])
+        timings["score"] = time.perf_counter() - t0
+    print(f"{label} accuracy on held-out data: {acc:.3f}")
 
+    pipeline = Pipeline(steps=[("scaler", data["scaler"]), ("clf", clf)])
 
-def train_and_save_svm_linear() -> None:
+    t0 = time.perf_counter()
+    path = CLASSICAL_MODEL_PATHS[name]
+    joblib.dump(pipeline, path)
+    if name == "random_forest":
+        # Memory-mappable copy the API serves from. Imported here because
+        # app.models.forest imports the model paths from this module
+        from app.models.forest import export_flat_forest
+
+        export_flat_forest(pipeline, source_path=path)
+    timings["serialize"] = time.perf_counter() - t0
+    print(f"Saved {label} model to {path}")
+
+    return {"accuracy": float(acc), "timings": timings}
+
+
+def _default_cpu_budgets(model_names: List[str]) -> Dict[str, int]:
+    """
+    LogReg and SVM fit on a single core; the forest gets whatever is left.
     """
-    Train a linear-kernel SVM (with probability estimates enabled) and save it.
+    n_cpus = os.cpu_count() or 1
+    budgets = {name: 1 for name in model_names}
+    if "random_forest" in budgets:
+        budgets["random_forest"] = max(1, n_cpus - (len(model_names) - 1))
+    return budgets
+
+
+def train_all_classical(
+    model_names: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    cpu_budgets: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, Any]]:
     """
-    print("Loading data for training (Linear SVM)...")
-    df = load_or_build_all_data()
+    Train and save several classical models from a single load/split/scale.
 
-    X_train, X_test, y_train, y_test = _train_test_split(df)
+    Models are fitted concurrently in a process pool (max_workers, default
+    one per model); cpu_budgets caps the cores each model may use.
 
-    pipeline = Pipeline(
-        steps=[
-            ("scaler", StandardScaler()),
-            ("clf", SVC(
-                kernel="linear",
-                probability=True,  # needed for predict_proba
-                random_state=42,
-            )),
-        ]
-    )
+    Returns {model_name: {"accuracy", "total_seconds", "phases"}} where phases
+    has load/split/scale (shared by all models in the run) and fit/score/
+    serialize (plus calibrate for svm_linear) per model, in seconds.
+    """
+    if model_names is None:
+        model_names = list(DEFAULT_CLASSICAL_MODELS)
+    unknown = [m for m in model_names if m not in CLASSICAL_MODEL_PATHS]
+    if unknown:
+        raise ValueError(f"Unknown classical model(s): {unknown}")
+
+    budgets = _default_cpu_budgets(model_names)
+    budgets.update(cpu_budgets or {})
+
+    print("Loading data for training (classical models)...")
+    data = prepare_training_data()
+    shared = data["timings"]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    workers = min(max_workers or len(model_names), len(model_names))
+    if workers <= 1:
+        for name in model_names:
+            results[name] = _fit_score_save(name, data, budgets[name])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_fit_score_save, name, data, budgets[name])
+                for name in model_names
+            }
+            for name, fut in futures.items():
+                results[name] = fut.result()
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for name, res in results.items():
+        phases = {**shared, **res["timings"]}
+        report[name] = {
+            "accuracy": res["accuracy"],
+            "total_seconds": sum(phases.values()),
+            "phases": phases,
+        }
+    return report
 
-    print("Training Linear SVM...")
-    pipeline.fit(X_train, y_train)
 
-    acc = pipeline.score(X_test, y_test)
-    print(f"Linear SVM accuracy on held-out data: {acc:.3f}")
+def train_and_save_random_forest() -> None:
+    """
+    Train a RandomForest classifier on the full (imbalanced) dataset and save it.
+    """
+    train_all_classical(["random_forest"])
 
-    joblib.dump(pipeline, SVM_MODEL_PATH)
-    print(f"Saved Linear SVM model to {SVM_MODEL_PATH}")
 
+def train_and_save_logreg() -> None:
+    """
+    Train a multinomial Logistic Regression classifier and save it.
+    """
+    train_all_classical(["logreg"])
 
-def get_random_forest_model():
+
+def train_and_save_svm_linear() -> None:
+    """
+    Train a primal linear SVM with a sigmoid calibration stage and save it.
+    """
+    train_all_classical(["svm_linear"])
+
+
+def get_random_forest_model(prefer_flat: bool = True):
     """
     Load the Random Forest model from disk.
-    
+
+    Prefers the memory-mapped flat export (models/random_forest_flat) when it
+    is up to date with the .pkl: it loads in milliseconds and its trees are
+    shared between workers instead of unpickled into each one. Bulk scoring
+    passes prefer_flat=False, since sklearn's compiled traversal is faster
+    over large batches.
+
     Only loads pre-trained model, never trains in production.
     """
+    # Imported here because app.models.forest imports the model paths from
+    # this module
+    from app.models.forest import FLAT_FOREST_DIR, FlatForestModel, flat_forest_is_fresh
+
+    if prefer_flat and flat_forest_is_fresh():
+        print(f"Memory-mapping flat Random Forest from {FLAT_FOREST_DIR}")
+        return FlatForestModel()
+
     if not RF_MODEL_PATH.exists():
+        if flat_forest_is_fresh():
+            return FlatForestModel()
         raise FileNotFoundError(
             f"Random Forest model not found at {RF_MODEL_PATH}. "
             f"Please run 'python -m app.models.classical' locally to train models, "
@@ -166,6 +357,18 @@ def get_logreg_model():
     return joblib.load(LOGREG_MODEL_PATH)
 
 
+def get_svm_svc_model():
+    """
+    Load the legacy libsvm SVC model if it was trained, else None.
+    Only used to compare engines in evaluate_models.py.
+    """
+    if not SVM_SVC_MODEL_PATH.exists():
+        return None
+
+    print(f"Loading libsvm SVC model from {SVM_SVC_MODEL_PATH}")
+    return joblib.load(SVM_SVC_MODEL_PATH)
+
+
 def get_svm_model():
     """
     Load the SVM model from disk.
@@ -185,6 +388,4 @@ def get_svm_model():
 
 if __name__ == "__main__":
     # Train all three classical models when this file is run directly
-    train_and_save_random_forest()
-    train_and_save_logreg()
-    train_and_save_svm_linear()
\ No newline at end of file
+    train_all_classical()
\ No newline at end of file
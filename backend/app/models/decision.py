@@ -0,0 +1,87 @@
+"""
+Array-based BUY/HOLD/SELL decision rules shared by the API, the evaluator
+and any batch scoring path.
+
+Everything works on an (N, 3) probability matrix whose columns follow
+DECISIONS, so scoring a million rows is one vectorized pass.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import config
+from app.schemas import Decision
+
+DECISIONS: Sequence[Decision] = ["BUY", "HOLD", "SELL"]
+BUY, HOLD, SELL = 0, 1, 2
+
+_DECISION_NAMES = np.asarray(DECISIONS)
+
+
+def align_probabilities(proba: np.ndarray, classes: Sequence[str]) -> np.ndarray:
+    """
+    Reorder an (N, C) predict_proba matrix with columns `classes`
+    (e.g. model.classes_) into an (N, 3) matrix in DECISIONS order.
+    Classes the model never saw get probability 0.
+    """
+    proba = np.asarray(proba, dtype=float)
+    classes = list(classes)
+
+    P = np.zeros((proba.shape[0], len(DECISIONS)), dtype=float)
+    for j, cls in enumerate(DECISIONS):
+        if cls in classes:
+            P[:, j] = proba[:, classes.index(cls)]
+    return P
+
+
+def hold_threshold_codes(P: np.ndarray, hold_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    HOLD-threshold rule to reduce HOLD bias, for every row of P at once:
+
+    - HOLD if p_hold >= hold_threshold and HOLD is the most likely class
+    - otherwise the more likely of BUY and SELL (ties go to BUY)
+
+    Returns int8 codes into DECISIONS.
+    """
+    if hold_threshold is None:
+        hold_threshold = config.HOLD_THRESHOLD
+
+    p_buy, p_hold, p_sell = P[:, BUY], P[:, HOLD], P[:, SELL]
+    is_hold = (p_hold >= hold_threshold) & (p_hold >= p_buy) & (p_hold >= p_sell)
+    codes = np.where(p_buy >= p_sell, BUY, SELL)
+    codes[is_hold] = HOLD
+    return codes.astype(np.int8)
+
+
+def argmax_codes(P: np.ndarray) -> np.ndarray:
+    """
+    Most likely class per row (first one on ties), as int8 codes into DECISIONS.
+    """
+    return np.argmax(P, axis=1).astype(np.int8)
+
+
+def decision_names(codes: np.ndarray) -> np.ndarray:
+    """
+    int8 codes -> "BUY"/"HOLD"/"SELL" strings.
+    """
+    return _DECISION_NAMES[codes]
+
+
+def predict_with_hold_threshold(
+    model, X: np.ndarray, hold_threshold: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One predict_proba call over X, then the HOLD-threshold rule on every row.
+
+    Returns (int8 decision codes of shape (N,), probabilities of shape (N, 3)).
+    """
+    P = align_probabilities(model.predict_proba(X), model.classes_)
+    return hold_threshold_codes(P, hold_threshold), P
+
+
+def probabilities_dict(p: np.ndarray) -> Dict[str, float]:
+    """
+    One row of an (N, 3) matrix -> {"BUY": ..., "HOLD": ..., "SELL": ...}.
+    """
+    return {d: float(v) for d, v in zip(DECISIONS, p)}
@@ -0,0 +1,234 @@
+"""
+Compact, memory-mappable export of the Random Forest pipeline.
+
+A pickled RandomForestClassifier restores every tree into private memory
+(sklearn copies the node arrays on unpickling), so each worker pays for the
+whole forest. Here the scaler and all trees are flattened into a handful of
+plain .npy arrays that are np.load(mmap_mode="r")-ed and shared between
+workers through the page cache:
+
+    models/random_forest_flat/
+      meta.json          classes, depth, source .pkl fingerprint
+      scaler_mean.npy    StandardScaler mean_
+      scaler_scale.npy   StandardScaler scale_
+      roots.npy          int64 (n_trees,) global node id of each tree root
+      feature.npy        int8/int16 (n_nodes,) split feature, -1 for leaves
+      threshold.npy      float64 (n_nodes,) split threshold
+      right.npy          int32 (n_nodes,) right child; for leaves, the row in leaf_values
+      leaf_values.npy    float64 (n_leaves, n_classes) normalized class distribution
+
+Trees are built depth-first, so the left child of node i is always i + 1
+and is not stored.
+
+Export an existing model with:
+    python -m app.models.forest
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+import joblib
+import numpy as np
+
+from app.cache import artifact_fingerprint
+from app.models.classical import MODELS_DIR, RF_MODEL_PATH
+
+FLAT_FOREST_DIR = MODELS_DIR / "random_forest_flat"
+FLAT_FOREST_VERSION = 1
+
+# Rows traversed at once; bounds the (rows, n_trees) working arrays
+_ROW_CHUNK = 2048
+
+
+def _source_fingerprint(path: Path) -> List[list]:
+    # app.cache.artifact_fingerprint in its JSON form (lists, not tuples)
+    return [list(part) for part in artifact_fingerprint([path])]
+
+
+def export_flat_forest(
+    pipeline,
+    out_dir: Path = FLAT_FOREST_DIR,
+    source_path: Optional[Path] = RF_MODEL_PATH,
+) -> Path:
+    """
+    Flatten a fitted StandardScaler + RandomForestClassifier pipeline.
+    """
+    scaler = pipeline.named_steps["scaler"]
+    forest = pipeline.named_steps["clf"]
+    n_classes = len(forest.classes_)
+
+    features, thresholds, rights, leaf_values, roots = [], [], [], [], []
+    node_offset = 0
+    leaf_offset = 0
+    max_depth = 0
+
+    for est in forest.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        left = tree.children_left
+        is_leaf = left == -1
+
+        internal = np.flatnonzero(~is_leaf)
+        if not np.array_equal(left[internal], internal + 1):
+            raise ValueError("Expected depth-first trees (left child == node + 1)")
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = tree.value[is_leaf, 0, :n_classes].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value /= normalizer
+
+        right = tree.children_right.astype(np.int64) + node_offset
+        right[is_leaf] = leaf_offset + np.arange(int(is_leaf.sum()))
+
+        feature = tree.feature.astype(np.int64)
+        feature[is_leaf] = -1
+
+        features.append(feature)
+        thresholds.append(tree.threshold.astype(np.float64))
+        rights.append(right)
+        leaf_values.append(value)
+        roots.append(node_offset)
+
+        node_offset += n
+        leaf_offset += value.shape[0]
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    if node_offset >= np.iinfo(np.int32).max:
+        raise ValueError("Forest too large for int32 node ids")
+
+    n_features = int(forest.n_features_in_)
+    feature_dtype = np.int8 if n_features < np.iinfo(np.int8).max else np.int16
+
+    arrays = {
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "roots": np.asarray(roots, dtype=np.int64),
+        "feature": np.concatenate(features).astype(feature_dtype),
+        "threshold": np.concatenate(thresholds),
+        "right": np.concatenate(rights).astype(np.int32),
+        "leaf_values": np.concatenate(leaf_values),
+    }
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    for name, arr in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", arr)
+
+    meta = {
+        "version": FLAT_FOREST_VERSION,
+        "classes": [str(c) for c in forest.classes_],
+        "n_trees": len(roots),
+        "n_nodes": node_offset,
+        "n_features": n_features,
+        "max_depth": max_depth,
+        "source": _source_fingerprint(source_path)
+        if source_path is not None and source_path.exists()
+        else None,
+    }
+    with (tmp_dir / "meta.json").open("w") as f:
+        json.dump(meta, f, indent=2)
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+
+    size_mb = sum(p.stat().st_size for p in out_dir.iterdir()) / (1024 * 1024)
+    print(f"Exported flat forest ({node_offset} nodes, {size_mb:.1f} MB) to {out_dir}")
+    return out_dir
+
+
+def flat_forest_is_fresh(
+    flat_dir: Path = FLAT_FOREST_DIR, source_path: Path = RF_MODEL_PATH
+) -> bool:
+    """
+    True if the export exists and was made from the current .pkl (or the
+    .pkl is not shipped at all, e.g. in the Docker image).
+    """
+    meta_path = flat_dir / "meta.json"
+    if not meta_path.exists():
+        return False
+    try:
+        meta = json.load(meta_path.open("r"))
+    except Exception:
+        return False
+    if meta.get("version") != FLAT_FOREST_VERSION:
+        return False
+    if not source_path.exists():
+        return True
+    return meta.get("source") == _source_fingerprint(source_path)
+
+
+class FlatForestModel:
+    """
+    Drop-in replacement for the scaler + RandomForest pipeline at inference
+    time: exposes classes_, predict_proba and predict over the memory-mapped
+    arrays. Results match the sklearn pipeline exactly (same float32 cast of
+    the scaled features, same per-tree normalization and summation order).
+    """
+
+    def __init__(self, flat_dir: Path = FLAT_FOREST_DIR, mmap_mode: Optional[str] = "r"):
+        self.flat_dir = flat_dir
+        self.meta = json.load((flat_dir / "meta.json").open("r"))
+        self.classes_ = np.asarray(self.meta["classes"], dtype=object)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(flat_dir / f"{name}.npy", mmap_mode=mmap_mode)
+
+        self.scaler_mean = np.asarray(load("scaler_mean"))
+        self.scaler_scale = np.asarray(load("scaler_scale"))
+        self.roots = np.asarray(load("roots"))
+        self.feature = load("feature")
+        self.threshold = load("threshold")
+        self.right = load("right")
+        self.leaf_values = load("leaf_values")
+
+    def _predict_proba_chunk(self, Xs: np.ndarray) -> np.ndarray:
+        n, n_trees = Xs.shape[0], self.roots.size
+
+        # One cursor per (row, tree); only cursors still on an internal node
+        # are advanced, so each level costs what is left of the forest.
+        node = np.tile(self.roots, n)
+        row = np.repeat(np.arange(n), n_trees)
+        active = np.flatnonzero(self.feature[node] >= 0)
+
+        while active.size:
+            nd = node[active]
+            go_left = Xs[row[active], self.feature[nd]] <= self.threshold[nd]
+            nd = np.where(go_left, nd + 1, self.right[nd])
+            node[active] = nd
+            active = active[self.feature[nd] >= 0]
+
+        # (n, n_trees, n_classes); summed tree by tree like sklearn
+        values = self.leaf_values[self.right[node]].reshape(n, n_trees, -1)
+        proba = np.zeros((n, values.shape[2]), dtype=np.float64)
+        for t in range(n_trees):
+            proba += values[:, t]
+        proba /= n_trees
+        return proba
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        # StandardScaler.transform, then the float32 cast sklearn trees apply
+        Xs = ((X - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+        out = np.empty((Xs.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, Xs.shape[0], _ROW_CHUNK):
+            stop = start + _ROW_CHUNK
+            out[start:stop] = self._predict_proba_chunk(Xs[start:stop])
+        return out
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+if __name__ == "__main__":
+    if not RF_MODEL_PATH.exists():
+        raise SystemExit(f"Random Forest model not found at {RF_MODEL_PATH}")
+    export_flat_forest(joblib.load(RF_MODEL_PATH))
@@ -0,0 +1,204 @@
+"""
+Precomputed predictions for every (ticker, date) row of the feature index.
+
+The universe is finite and static, so every model can be run once over the
+whole dataset offline. /api/predict then serves a row from the table in O(1)
+instead of running predict_proba or a circuit simulation per request.
+
+    models/prediction_table/
+      meta.json                 index fingerprint, HOLD threshold, model versions
+      <model>_codes.npy         int8 (N,) decision codes into DECISIONS
+      <model>_proba.npy         float64 (N, 3) BUY/HOLD/SELL probabilities
+
+Rows line up with FeatureIndex rows. The table is only used with an index
+that has the same fingerprint, and a model's columns only while that
+model's artifacts still match the version recorded here. Anything stale
+falls back to live inference.
+
+Build (or rebuild) with:
+    python -m app.models.prediction_table [--models logreg quantum_qnn ...]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from app import config
+from app.cache import Fingerprint
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.models.classical import MODELS_DIR
+from app.models.decision import DECISIONS, decision_names, probabilities_dict
+from app.models.registry import MODEL_NAMES, load_model, model_version, score_batch
+
+TABLE_DIR = MODELS_DIR / "prediction_table"
+TABLE_VERSION = 1
+
+def _jsonable(version: Fingerprint) -> List[list]:
+    return [list(part) for part in version]
+
+
+def build_prediction_table(
+    model_names: List[str] = None,
+    index: Optional[FeatureIndex] = None,
+    table_dir: Path = TABLE_DIR,
+) -> Path:
+    """
+    Score every row of the feature index with each model and write the table.
+    Models whose artifacts are missing are skipped (and served live); models
+    not listed keep their columns from the current table if it still matches
+    the index.
+    """
+    if model_names is None:
+        model_names = MODEL_NAMES
+    if index is None:
+        index = load_feature_index()
+
+    n_rows = len(index)
+    meta = {
+        "version": TABLE_VERSION,
+        "n_rows": n_rows,
+        "index_fingerprint": index.fingerprint(),
+        "hold_threshold": config.HOLD_THRESHOLD,
+        "models": {},
+    }
+
+    tmp_dir = table_dir.with_name(table_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    existing = load_prediction_table(index, table_dir)
+    if existing is not None:
+        for name, entry in existing.meta["models"].items():
+            if name in model_names:
+                continue
+            for suffix in ("codes", "proba"):
+                shutil.copy2(table_dir / f"{name}_{suffix}.npy", tmp_dir)
+            meta["models"][name] = entry
+            print(f"Keeping {name} from the current table")
+
+    for name in model_names:
+        version = model_version(name)
+        try:
+            # sklearn's compiled forest traversal is faster than the flat export in bulk
+            model = load_model(name, prefer_flat_forest=False)
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"Skipping {name}: {e}")
+            continue
+
+        # Scored chunk by chunk straight into the .npy files, so memory stays
+        # at one chunk however many rows there are
+        codes = open_memmap(tmp_dir / f"{name}_codes.npy", mode="w+", dtype=np.int8, shape=(n_rows,))
+        proba = open_memmap(
+            tmp_dir / f"{name}_proba.npy", mode="w+", dtype=np.float64, shape=(n_rows, len(DECISIONS))
+        )
+
+        t0 = time.perf_counter()
+        for start, X, _ in index.iter_chunks():
+            codes[start : start + len(X)], proba[start : start + len(X)] = score_batch(name, model, X)
+        codes.flush()
+        proba.flush()
+        del codes, proba
+        seconds = time.perf_counter() - t0
+        meta["models"][name] = {
+            "version": _jsonable(version),
+            "seconds": seconds,
+        }
+        print(f"Scored {n_rows} rows with {name} in {seconds:.2f}s ({n_rows / seconds:,.0f} rows/s)")
+
+    with (tmp_dir / "meta.json").open("w") as f:
+        json.dump(meta, f, indent=2)
+
+    if table_dir.exists():
+        shutil.rmtree(table_dir)
+    os.replace(tmp_dir, table_dir)
+    print(f"Saved prediction table for {list(meta['models'])} to {table_dir}")
+    return table_dir
+
+
+class PredictionTable:
+    """
+    Read-only, memory-mapped view of a built table.
+    """
+
+    def __init__(self, meta: dict, table_dir: Path = TABLE_DIR):
+        self.meta = meta
+        self.table_dir = table_dir
+        self.codes: Dict[str, np.ndarray] = {}
+        self.proba: Dict[str, np.ndarray] = {}
+        for name in meta["models"]:
+            self.codes[name] = np.load(table_dir / f"{name}_codes.npy", mmap_mode="r")
+            self.proba[name] = np.load(table_dir / f"{name}_proba.npy", mmap_mode="r")
+
+    def is_fresh(self, model_name: str, version: Fingerprint) -> bool:
+        """
+        True if the table has `model_name`, built from the artifacts that
+        currently have `version` (see registry.model_version).
+        """
+        entry = self.meta["models"].get(model_name)
+        return entry is not None and entry["version"] == _jsonable(version)
+
+    def lookup(
+        self, model_name: str, row: int, version: Fingerprint
+    ) -> Optional[Tuple[str, Dict[str, float]]]:
+        """
+        (decision, probabilities) for one row, or None if not fresh.
+        """
+        if not self.is_fresh(model_name, version):
+            return None
+        decision = str(decision_names(self.codes[model_name][row]))
+        return decision, probabilities_dict(self.proba[model_name][row])
+
+    def rows(
+        self, model_name: str, rows: np.ndarray, version: Fingerprint
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (codes, probabilities) for many rows, or None if not fresh.
+        """
+        if not self.is_fresh(model_name, version):
+            return None
+        return self.codes[model_name][rows], self.proba[model_name][rows]
+
+
+def load_prediction_table(
+    index: FeatureIndex, table_dir: Path = TABLE_DIR
+) -> Optional[PredictionTable]:
+    """
+    Map the table if it exists and was built for this exact feature index and
+    HOLD threshold; otherwise None (every request is served live).
+    """
+    meta_path = table_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.load(meta_path.open("r"))
+    except Exception as e:
+        print(f"Could not read prediction table meta {meta_path}: {e!r}")
+        return None
+
+    if (
+        meta.get("version") != TABLE_VERSION
+        or meta.get("n_rows") != len(index)
+        or meta.get("hold_threshold") != config.HOLD_THRESHOLD
+        or meta.get("index_fingerprint") != index.fingerprint()
+    ):
+        print(f"Prediction table at {table_dir} is stale; serving live predictions")
+        return None
+
+    print(f"Memory-mapping prediction table for {list(meta['models'])} from {table_dir}")
+    return PredictionTable(meta, table_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute predictions for every row.")
+    parser.add_argument("--models", nargs="*", default=list(MODEL_NAMES), choices=MODEL_NAMES)
+    args = parser.parse_args()
+
+    build_prediction_table(model_names=args.models)
@@ -1,22 +1,19 @@
 # current actual file that I have locally
 from pathlib import Path
-from typing import Dict, Sequence
+from typing import Dict, Tuple
 
 import math
 import numpy as np
 
+from app.cache import Fingerprint, artifact_fingerprint
+from app.models.decision import argmax_codes
 from app.schemas import Decision
 
-#  Qiskit imports for VQC-style model 
-from qiskit import QuantumCircuit
-from qiskit.quantum_info import Statevector
-
-# PennyLane imports (for QNN-style model) 
-import pennylane as qml
+# Qiskit and PennyLane are only imported by the reference circuits
+# (_qiskit_vqc_probs, _pl_qnn_circuit): serving uses the NumPy kernels, and
+# importing both frameworks takes ~2s, which would delay API startup.
 
 # paths and constants
-DECISIONS: Sequence[Decision] = ["BUY", "HOLD", "SELL"]
-
 ROOT_DIR = Path(__file__).resolve().parents[3]
 MODELS_DIR = ROOT_DIR / "models"
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
@@ -25,6 +22,10 @@ QNN_WEIGHTS_PATH = MODELS_DIR / "quantum_qnn_weights.npy"
 
 # We'll lazily load weights the first time we need them
 _QNN_WEIGHTS: np.ndarray | None = None
+_QNN_WEIGHTS_VERSION: Fingerprint = ()
+
+# PennyLane QNode for _pl_qnn_circuit, built on first use
+_PL_QNODE = None
 
 
 def _softmax(logits: np.ndarray) -> np.ndarray:
@@ -55,6 +56,22 @@ def _prepare_angles(features: np.ndarray, num_qubits: int = 2) -> np.ndarray:
     return x
 
 
+def _prepare_angles_batch(X: np.ndarray, num_qubits: int = 2) -> np.ndarray:
+    """
+    Row-wise _prepare_angles for an (N, F) feature matrix -> (N, num_qubits).
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+
+    if X.shape[1] < num_qubits:
+        X = np.pad(X, ((0, 0), (0, num_qubits - X.shape[1])), mode="constant")
+    else:
+        X = X[:, :num_qubits]
+
+    return np.tanh(X) * math.pi
+
+
 def _map_probs_2qubits_to_decisions(probs: np.ndarray) -> Dict[Decision, float]:
     """
     Map 2-qubit measurement probabilities (length-4 vector: [p00,p01,p10,p11])
@@ -86,12 +103,36 @@ def _map_probs_2qubits_to_decisions(probs: np.ndarray) -> Dict[Decision, float]:
     }
 
 
+def _map_probs_2qubits_to_decisions_batch(probs: np.ndarray) -> np.ndarray:
+    """
+    Row-wise _map_probs_2qubits_to_decisions for an (N, 4) matrix.
+    Returns an (N, 3) matrix with columns BUY/HOLD/SELL.
+    """
+    probs = np.asarray(probs, dtype=float)
+    if probs.ndim != 2 or probs.shape[1] != 4:
+        raise ValueError(f"Expected an (N, 4) probability matrix, got {probs.shape}")
+
+    P = np.stack(
+        [probs[:, 0], probs[:, 1], probs[:, 2] + probs[:, 3]],
+        axis=1,
+    )
+    total = P.sum(axis=1, keepdims=True)
+    valid = total[:, 0] > 0
+
+    out = np.full_like(P, 1 / 3)
+    out[valid] = P[valid] / total[valid]
+    return out
+
+
 # Qiskit VQC-style model (still untrained baseline)
 def _qiskit_vqc_probs(features: np.ndarray) -> np.ndarray:
     """
     Build a tiny 2-qubit parameterized circuit, encode features as rotations,
     and simulate its statevector using Qiskit. Return the 4 outcome probabilities.
     """
+    from qiskit import QuantumCircuit
+    from qiskit.quantum_info import Statevector
+
     num_qubits = 2
     angles = _prepare_angles(features, num_qubits=num_qubits)
 
@@ -108,6 +149,40 @@ def _qiskit_vqc_probs(features: np.ndarray) -> np.ndarray:
     return probs
 
 
+def _vqc_probs_batch(X: np.ndarray) -> np.ndarray:
+    """
+    Closed-form equivalent of _qiskit_vqc_probs for a whole (N, F) matrix.
+
+    The circuit is RY(a0) on qubit 0, RY(a1) on qubit 1, then CZ. Each RY
+    leaves cos(a/2)|0> + sin(a/2)|1>, and CZ only flips the sign of |11>,
+    so the outcome probabilities are products of cos^2/sin^2 terms.
+    Columns follow Qiskit's little-endian order (qubit 0 is the low bit):
+    [p00, p01, p10, p11] = [c0 c1, s0 c1, c0 s1, s0 s1] (squared).
+    """
+    angles = _prepare_angles_batch(X, num_qubits=2)
+    c = np.cos(angles / 2) ** 2
+    s = np.sin(angles / 2) ** 2
+
+    return np.stack(
+        [
+            c[:, 0] * c[:, 1],
+            s[:, 0] * c[:, 1],
+            c[:, 0] * s[:, 1],
+            s[:, 0] * s[:, 1],
+        ],
+        axis=1,
+    )
+
+
+def quantum_vqc_predict_batch(X: np.ndarray) -> np.ndarray:
+    """
+    Vectorized quantum_vqc_predict: simulates the VQC circuit for every row
+    of X in NumPy (no per-sample circuit construction) and returns an (N, 3)
+    matrix of BUY/HOLD/SELL probabilities.
+    """
+    return _map_probs_2qubits_to_decisions_batch(_vqc_probs_batch(X))
+
+
 def quantum_vqc_predict(features: np.ndarray) -> Dict[Decision, float]:
     """
     Quantum Variational Classifier (simulated) using Qiskit.
@@ -117,19 +192,49 @@ def quantum_vqc_predict(features: np.ndarray) -> Dict[Decision, float]:
       - applies an entangling CZ gate
       - uses the resulting state probabilities as a nonlinear feature map
       - maps those probabilities to BUY/HOLD/SELL.
+
+    Evaluated with the closed-form simulator; _qiskit_vqc_probs is kept as
+    the reference implementation.
     """
-    probs_4 = _qiskit_vqc_probs(features)
+    probs_4 = _vqc_probs_batch(np.asarray(features, dtype=float).reshape(1, -1))[0]
     decision_probs = _map_probs_2qubits_to_decisions(probs_4)
     return decision_probs
 
 
 # PennyLane-based trained QNN
 
-# A tiny device with 2 qubits; we reuse it for inference
-_pl_dev = qml.device("default.qubit", wires=2)
+def _pl_qnn_qnode():
+    """
+    Build (once) the PennyLane QNode behind _pl_qnn_circuit, on a tiny
+    2-qubit device that is reused for every call.
+    """
+    global _PL_QNODE
+    if _PL_QNODE is not None:
+        return _PL_QNODE
+
+    import pennylane as qml
+
+    dev = qml.device("default.qubit", wires=2)
+
+    @qml.qnode(dev)
+    def circuit(angles, weights):
+        # Feature encoding
+        qml.RY(angles[0], wires=0)
+        qml.RY(angles[1], wires=1)
+
+        # Entanglement
+        qml.CZ(wires=[0, 1])
+
+        # Trainable layer
+        qml.RY(weights[0], wires=0)
+        qml.RY(weights[1], wires=1)
+
+        return qml.probs(wires=[0, 1])
+
+    _PL_QNODE = circuit
+    return _PL_QNODE
 
 
-@qml.qnode(_pl_dev)
 def _pl_qnn_circuit(angles, weights):
     """
     Simple QNode for inference:
@@ -139,27 +244,19 @@ def _pl_qnn_circuit(angles, weights):
       - applies trainable Ry rotations with parameters "weights"
       - returns the full probability distribution over 2 qubits
     """
-    # Feature encoding
-    qml.RY(angles[0], wires=0)
-    qml.RY(angles[1], wires=1)
-
-    # Entanglement
-    qml.CZ(wires=[0, 1])
-
-    # Trainable layer
-    qml.RY(weights[0], wires=0)
-    qml.RY(weights[1], wires=1)
-
-    return qml.probs(wires=[0, 1])
+    return _pl_qnn_qnode()(angles, weights)
 
 
 def _load_qnn_weights() -> np.ndarray:
     """
     Load trained weights for the quantum QNN from disk.
     If the file is missing, raise a clear error message.
+    Reloads them if the file was rewritten (e.g. by a new training run).
     """
-    global _QNN_WEIGHTS
-    if _QNN_WEIGHTS is not None:
+    global _QNN_WEIGHTS, _QNN_WEIGHTS_VERSION
+
+    version = artifact_fingerprint([QNN_WEIGHTS_PATH])
+    if _QNN_WEIGHTS is not None and version == _QNN_WEIGHTS_VERSION:
         return _QNN_WEIGHTS
 
     if not QNN_WEIGHTS_PATH.exists():
@@ -169,21 +266,84 @@ def _load_qnn_weights() -> np.ndarray:
         )
 
     _QNN_WEIGHTS = np.load(QNN_WEIGHTS_PATH)
+    _QNN_WEIGHTS_VERSION = version
     return _QNN_WEIGHTS
 
 
+def _ry_matrix(theta: float) -> np.ndarray:
+    c, s = math.cos(theta / 2), math.sin(theta / 2)
+    return np.array([[c, -s], [s, c]])
+
+
+def _qnn_probs_batch(angles: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Hand-written statevector kernel equivalent to _pl_qnn_circuit for a whole
+    (N, 2) angle matrix at once. Returns an (N, 4) probability matrix in
+    PennyLane's wire order (wire 0 is the high bit).
+
+    All amplitudes stay real (RY and CZ only), so the state is an (N, 4) float
+    array:
+      - RY encoding gives the product state [c0 c1, c0 s1, s0 c1, s0 s1]
+      - CZ flips the sign of |11>
+      - the trainable RY(w0) x RY(w1) layer is one fixed 4x4 matrix
+    """
+    angles = np.asarray(angles, dtype=float)
+    c = np.cos(angles / 2)
+    s = np.sin(angles / 2)
+
+    state = np.stack(
+        [
+            c[:, 0] * c[:, 1],
+            c[:, 0] * s[:, 1],
+            s[:, 0] * c[:, 1],
+            -(s[:, 0] * s[:, 1]),  # CZ phase on |11>
+        ],
+        axis=1,
+    )
+
+    layer = np.kron(_ry_matrix(weights[0]), _ry_matrix(weights[1]))
+    state = state @ layer.T
+    return state**2
+
+
+def quantum_qnn_predict_batch(X: np.ndarray) -> np.ndarray:
+    """
+    Vectorized quantum_qnn_predict: evaluates the trained circuit for every
+    row of X in one call and returns an (N, 3) matrix of BUY/HOLD/SELL
+    probabilities.
+    """
+    weights = _load_qnn_weights()
+    angles = _prepare_angles_batch(X, num_qubits=2)
+    return _map_probs_2qubits_to_decisions_batch(_qnn_probs_batch(angles, weights))
+
+
+def quantum_score_batch(model_name: str, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    registry.score_batch for the quantum models: (int8 decision codes, (N, 3)
+    probabilities), most likely class first. Lives here rather than in the
+    registry so quantum worker processes (app.scheduler) never import sklearn.
+    """
+    if model_name == "quantum_vqc":
+        P = quantum_vqc_predict_batch(X)
+    else:
+        P = quantum_qnn_predict_batch(X)
+    return argmax_codes(P), P
+
+
 def quantum_qnn_predict(features: np.ndarray) -> Dict[Decision, float]:
     """
     Quantum Neural Network (simulated) using PennyLane, *with trained weights*.
 
     - Loads trainable parameters from models/quantum_qnn_weights.npy.
-    - Runs the QNode on the given features.
+    - Simulates the trained circuit on the given features.
     - Maps 2-qubit probabilities to BUY/HOLD/SELL.
+
+    Evaluated with the statevector kernel; _pl_qnn_circuit is kept as the
+    reference implementation.
     """
     weights = _load_qnn_weights()
-    angles = _prepare_angles(features, num_qubits=2)
+    angles = _prepare_angles(features, num_qubits=2).reshape(1, -1)
 
-    # QNode expects plain numpy arrays and returns a length-4 array
-    probs_4 = _pl_qnn_circuit(angles, weights)
+    probs_4 = _qnn_probs_batch(angles, weights)[0]
     decision_probs = _map_probs_2qubits_to_decisions(probs_4)
     return decision_probs
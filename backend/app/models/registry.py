@@ -0,0 +1,72 @@
+"""
+Names, on-disk artifacts and batch scoring for every model the API serves.
+
+Shared by the API and the prediction table job so that both version and
+score models the same way.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.cache import Fingerprint, artifact_fingerprint
+from app.models.classical import (
+    LOGREG_MODEL_PATH,
+    RF_MODEL_PATH,
+    SVM_MODEL_PATH,
+    get_logreg_model,
+    get_random_forest_model,
+    get_svm_model,
+)
+from app.models.decision import predict_with_hold_threshold
+from app.models.forest import FLAT_FOREST_DIR
+from app.models.quantum import QNN_WEIGHTS_PATH, quantum_score_batch
+
+CLASSICAL_MODEL_NAMES = ["random_forest", "logreg", "svm_linear"]
+QUANTUM_MODEL_NAMES = ["quantum_vqc", "quantum_qnn"]
+MODEL_NAMES = CLASSICAL_MODEL_NAMES + QUANTUM_MODEL_NAMES
+
+# Files each model is loaded from; their size + mtime version the model, so
+# retraining reloads it and invalidates cached / precomputed predictions.
+MODEL_ARTIFACTS: Dict[str, List[Path]] = {
+    "random_forest": [RF_MODEL_PATH, FLAT_FOREST_DIR / "meta.json"],
+    "logreg": [LOGREG_MODEL_PATH],
+    "svm_linear": [SVM_MODEL_PATH],
+    "quantum_vqc": [],  # fixed circuit, nothing trained
+    "quantum_qnn": [QNN_WEIGHTS_PATH],
+}
+
+
+def model_version(model_name: str) -> Fingerprint:
+    return artifact_fingerprint(MODEL_ARTIFACTS[model_name])
+
+
+def load_model(model_name: str, prefer_flat_forest: bool = True):
+    """
+    Load a classical model for scoring; quantum models need nothing loaded
+    (their weights are read by the batch kernels) and return None.
+    """
+    if model_name in QUANTUM_MODEL_NAMES:
+        return None
+    if model_name == "random_forest":
+        return get_random_forest_model(prefer_flat=prefer_flat_forest)
+    if model_name == "logreg":
+        return get_logreg_model()
+    return get_svm_model()
+
+
+def score_batch(model_name: str, model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score every row of X with one model.
+
+    Classical models use the HOLD-threshold rule on `model` (a loaded
+    pipeline); quantum models ignore `model`, run their batch kernel and take
+    the most likely class.
+
+    Returns (int8 decision codes of shape (N,), probabilities of shape (N, 3)).
+    """
+    if model_name in CLASSICAL_MODEL_NAMES:
+        return predict_with_hold_threshold(model, X)
+
+    return quantum_score_batch(model_name, X)
@@ -0,0 +1,258 @@
+"""
+Vectorized P&L of trading a model's BUY/HOLD/SELL decisions.
+
+Hold rule (the one the labels are built on): a decision made at the close
+of day t opens a position held for LABEL_HORIZON_DAYS (H) trading days:
+long for BUY, short for SELL, flat for HOLD. A new decision is made every
+day, so H overlapping tranches of 1/H capital are open per ticker at any
+time and the position held from close s to close s+1 is
+
+    pos[s] = (signal[s] + signal[s-1] + ... + signal[s-H+1]) / H
+
+Everything is computed on dense (date, ticker) panels built from the
+feature index and `Adj Close`, with no per-trade loop:
+
+    ticker return    pos[s] * (price[s+1] / price[s] - 1) - cost * |pos[s] - pos[s-1]|
+    portfolio return equal weight over the tickers listed that day
+
+Run from the command line with:
+    python -m app.models.simulator --model logreg [--start 2018-03-01] [--end 2020-01-31]
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app import config
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.models.decision import BUY, SELL
+from app.models.prediction_table import PredictionTable, load_prediction_table
+from app.models.registry import MODEL_NAMES, load_model, model_version, score_batch
+
+TRADING_DAYS = 252
+
+# (model_name, model version, index fingerprint) -> live-scored decision codes
+_DECISIONS: Dict[tuple, np.ndarray] = {}
+
+
+def adj_close(index: FeatureIndex) -> np.ndarray:
+    """
+    `Adj Close` per feature-index row (same row order). Carried by the index
+    itself, so it is a shared memory map when the feature store is fresh.
+    """
+    return np.asarray(index.adj_close, dtype=np.float64)
+
+
+def to_panel(index: FeatureIndex, values: np.ndarray, fill) -> np.ndarray:
+    """
+    Per-row values -> dense (n_dates, n_tickers) panel; cells without a row
+    get `fill`.
+    """
+    ticker_codes, date_codes = index.row_coordinates()
+    mapped = ticker_codes >= 0
+    panel = np.full((len(index.dates), len(index.tickers)), fill, dtype=np.asarray(values).dtype)
+    panel[date_codes[mapped], ticker_codes[mapped]] = np.asarray(values)[mapped]
+    return panel
+
+
+def model_decisions(
+    model_name: str,
+    index: FeatureIndex,
+    table: Optional[PredictionTable],
+    model=None,
+) -> np.ndarray:
+    """
+    int8 decision code per row: from the prediction table when it is current
+    for the model, otherwise scored in chunks (`model` is loaded if needed)
+    and kept for later calls with the same model version.
+    """
+    version = model_version(model_name)
+    if table is not None:
+        hit = table.rows(model_name, np.arange(len(index)), version)
+        if hit is not None:
+            return np.asarray(hit[0])
+
+    key = (model_name, version, index.fingerprint())
+    if key not in _DECISIONS:
+        if model is None:
+            model = load_model(model_name)
+        codes = np.empty(len(index), dtype=np.int8)
+        for start, X, _ in index.iter_chunks():
+            codes[start : start + len(X)], _ = score_batch(model_name, model, X)
+        _DECISIONS[key] = codes
+    return _DECISIONS[key]
+
+
+def _ffill(panel: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill NaNs down each column (date axis).
+    """
+    valid = ~np.isnan(panel)
+    idx = np.where(valid, np.arange(panel.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return panel[idx, np.arange(panel.shape[1])]
+
+
+def _stats(returns: np.ndarray, turnover: np.ndarray, exposure: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Summary statistics of daily return series along axis 0 (one column per
+    series).
+    """
+    equity = np.cumprod(1.0 + returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1.0
+    n_days = returns.shape[0]
+
+    mean = returns.mean(axis=0)
+    vol = returns.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, mean / vol * np.sqrt(TRADING_DAYS), 0.0)
+
+    return {
+        "total_return": equity[-1] - 1.0,
+        "annualized_return": equity[-1] ** (TRADING_DAYS / n_days) - 1.0,
+        "annualized_volatility": vol * np.sqrt(TRADING_DAYS),
+        "sharpe": sharpe,
+        "max_drawdown": drawdown.min(axis=0),
+        "turnover": turnover.mean(axis=0),
+        "exposure": exposure.mean(axis=0),
+    }
+
+
+def _pick(stats: Dict[str, np.ndarray], j=None) -> Dict[str, float]:
+    return {k: float(v if j is None else v[j]) for k, v in stats.items()}
+
+
+def simulate(
+    index: FeatureIndex,
+    prices: np.ndarray,
+    codes: np.ndarray,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tickers: Optional[List[str]] = None,
+    horizon: Optional[int] = None,
+    cost_bps: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Trade `codes` (one decision per row) with the H-day hold rule between
+    start_date and end_date (decision days, inclusive) on `tickers`.
+
+    Returns portfolio, equal-weight buy-and-hold benchmark and per-ticker
+    statistics, plus the daily portfolio equity curve.
+    """
+    if horizon is None:
+        horizon = config.LABEL_HORIZON_DAYS
+
+    dates = index.dates
+    d_lo = 0 if start_date is None else int(np.searchsorted(dates, start_date, side="left"))
+    d_hi = len(dates) if end_date is None else int(np.searchsorted(dates, end_date, side="right"))
+    t_sel = np.arange(len(index.tickers))
+    if tickers is not None:
+        t_sel = np.asarray([index.ticker_pos[t] for t in tickers if t in index.ticker_pos], dtype=np.int64)
+    if d_hi - d_lo < 2 or t_sel.size == 0:
+        raise ValueError("Need at least two trading days and one known ticker")
+
+    # (D, T) panels; the last decision day also needs the next day's price
+    price = to_panel(index, prices, np.nan)[:, t_sel]
+    listed = ~np.isnan(price)
+    price = _ffill(price)
+    step = np.zeros_like(price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step[:-1] = price[1:] / price[:-1] - 1.0
+    step[~np.isfinite(step)] = 0.0
+
+    decision = to_panel(index, codes.astype(np.int8), -1)[:, t_sel]
+    signal = np.where(decision == BUY, 1.0, np.where(decision == SELL, -1.0, 0.0))
+    signal[:d_lo] = 0.0
+    signal[d_hi:] = 0.0
+
+    # Rolling sum of the last H signals = open tranches
+    csum = np.cumsum(signal, axis=0)
+    pos = csum.copy()
+    pos[horizon:] -= csum[:-horizon]
+    pos /= horizon
+
+    # Days s in [d_lo, d_hi - 1): position over (s, s + 1]; the last decision
+    # day has no next close inside the window
+    span = slice(d_lo, min(d_hi, len(dates) - 1))
+    prev = np.vstack([np.zeros((1, pos.shape[1])), pos[:-1]])
+    active = listed[span] & listed[span.start + 1 : span.stop + 1]
+    # Only days the portfolio holds the ticker count, per ticker as in total
+    turnover = np.where(active, np.abs(pos - prev)[span], 0.0)
+    exposure = np.where(active, np.abs(pos[span]), 0.0)
+    ticker_ret = np.where(active, pos[span] * step[span], 0.0) - cost_bps * 1e-4 * turnover
+
+    n_active = active.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(active, 1.0 / np.maximum(n_active, 1)[:, None], 0.0)
+    port_ret = (weights * ticker_ret).sum(axis=1, keepdims=True)
+    port_turnover = (weights * turnover).sum(axis=1, keepdims=True)
+    port_exposure = (weights * exposure).sum(axis=1, keepdims=True)
+    bench_ret = (weights * step[span]).sum(axis=1, keepdims=True)
+
+    portfolio = _stats(port_ret, port_turnover, port_exposure)
+    benchmark = _stats(bench_ret, np.zeros_like(bench_ret), (n_active > 0)[:, None].astype(float))
+    per_ticker = _stats(ticker_ret, turnover, exposure)
+
+    equity = np.cumprod(1.0 + port_ret[:, 0])
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    curve_dates = dates[span.start + 1 : span.stop + 1]
+
+    return {
+        "params": {
+            "start_date": dates[d_lo],
+            "end_date": dates[d_hi - 1],
+            "horizon_days": horizon,
+            "cost_bps": cost_bps,
+            "n_tickers": int(t_sel.size),
+        },
+        "portfolio": _pick(portfolio, 0),
+        "buy_and_hold": _pick(benchmark, 0),
+        "tickers": {
+            index.tickers[t]: _pick(per_ticker, j)
+            for j, t in enumerate(t_sel.tolist())
+            if active[:, j].any()
+        },
+        "equity_curve": {
+            "dates": list(curve_dates),
+            "equity": equity.tolist(),
+            "drawdown": drawdown.tolist(),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate trading a model's decisions.")
+    parser.add_argument("--model", default="random_forest", choices=MODEL_NAMES)
+    parser.add_argument("--start", default=None, help="First decision day, YYYY-MM-DD")
+    parser.add_argument("--end", default=None, help="Last decision day, YYYY-MM-DD")
+    parser.add_argument("--tickers", nargs="*", default=None)
+    parser.add_argument("--cost-bps", type=float, default=0.0, help="Cost per unit of turnover")
+    parser.add_argument("--out", default=None, help="Write the full result as JSON")
+    args = parser.parse_args()
+
+    index = load_feature_index()
+    result = simulate(
+        index,
+        adj_close(index),
+        model_decisions(args.model, index, load_prediction_table(index)),
+        start_date=args.start,
+        end_date=args.end,
+        tickers=args.tickers,
+        cost_bps=args.cost_bps,
+    )
+
+    p = result["params"]
+    print(f"{args.model}: {p['start_date']} .. {p['end_date']}, {p['n_tickers']} tickers, H={p['horizon_days']}")
+    for name in ("portfolio", "buy_and_hold"):
+        s = result[name]
+        print(
+            f"  {name:13s} total {s['total_return']:+.2%}  ann. {s['annualized_return']:+.2%}  "
+            f"vol {s['annualized_volatility']:.2%}  sharpe {s['sharpe']:.2f}  "
+            f"max DD {s['max_drawdown']:.2%}  turnover {s['turnover']:.3f}/day"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved simulation to {args.out}")
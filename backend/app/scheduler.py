@@ -0,0 +1,222 @@
+"""
+Bounded executors for model inference.
+
+Live (non-table) scoring used to run inline in the request handlers, on
+the server's shared threadpool: a burst of slow requests for one model
+could hold every thread and starve cheap requests for the others. Here each
+kind of model gets its own bounded pool:
+
+  - classical models: a thread pool (config.INFERENCE_THREADS, by default
+    the sum of their concurrency limits); sklearn releases the GIL in much
+    of predict_proba
+  - quantum models: a process pool (config.INFERENCE_PROCESSES), so
+    simulation runs outside the API process's GIL
+
+and each model its own limits on top of that: at most
+config.MODEL_CONCURRENCY[model] jobs running at once, and at most
+config.MODEL_QUEUE_LIMIT more waiting for a slot. A job that finds its
+model's queue full is rejected right away with Overloaded (a 429 in the
+API) instead of waiting behind it.
+
+Waiting jobs sit in a per-model deque rather than in the pool, so a model
+at its limit never holds a pool worker that another model could use.
+
+    future = SCHEDULER.submit("logreg", fn, X)  # raises Overloaded
+    result = await asyncio.wrap_future(future)  # or future.result()
+
+Jobs for the process pool must be picklable (module-level functions).
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app import config
+from app.models.registry import CLASSICAL_MODEL_NAMES, MODEL_NAMES
+from app.telemetry import METRICS
+
+METRICS.describe("inference_rejected_total", "Inference jobs rejected because the model's queue was full.")
+METRICS.describe("inference_queue_wait_seconds", "Time an inference job waited for a slot, by model.")
+METRICS.describe("inference_run_seconds", "Time an inference job ran in its pool, by model.")
+
+
+class Overloaded(RuntimeError):
+    """
+    The model's queue is full; the caller should back off and retry.
+    """
+
+
+class _ModelQueue:
+    __slots__ = ("limit", "running", "waiting")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        # (future, fn, args, enqueued_at)
+        self.waiting: Deque[Tuple[Future, Callable, tuple, float]] = deque()
+
+
+class InferenceScheduler:
+    """
+    Per-model admission and queueing in front of a thread pool (classical
+    models) and a process pool (quantum models); see the module docstring.
+    Pools are created on first use.
+    """
+
+    def __init__(
+        self,
+        threads: Optional[int] = config.INFERENCE_THREADS,
+        processes: int = config.INFERENCE_PROCESSES,
+        concurrency: Optional[Dict[str, int]] = None,
+        queue_limit: int = config.MODEL_QUEUE_LIMIT,
+    ):
+        self.processes = processes
+        self.queue_limit = queue_limit
+        limits = {**config.MODEL_CONCURRENCY, **(concurrency or {})}
+        self._queues = {name: _ModelQueue(limits.get(name, 1)) for name in MODEL_NAMES}
+        if threads is None:
+            threads = sum(
+                q.limit
+                for name, q in self._queues.items()
+                if name in CLASSICAL_MODEL_NAMES or processes <= 0
+            )
+        self.threads = threads
+        self._lock = threading.Lock()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+
+    def _pool_for(self, model_name: str) -> Executor:
+        with self._lock:
+            if model_name in CLASSICAL_MODEL_NAMES or self.processes <= 0:
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(
+                        max_workers=self.threads, thread_name_prefix="inference"
+                    )
+                return self._thread_pool
+
+            if self._process_pool is None:
+                # spawn, not fork: the API process has threads running
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._process_pool
+
+    def submit(self, model_name: str, fn: Callable, *args: Any) -> Future:
+        """
+        Run fn(*args) for model_name as soon as the model has a free slot.
+        Raises Overloaded if its queue is already full.
+        """
+        queue = self._queues[model_name]
+        future: Future = Future()
+        job = (future, fn, args, time.perf_counter())
+
+        with self._lock:
+            if queue.running < queue.limit:
+                queue.running += 1
+            elif len(queue.waiting) < self.queue_limit:
+                queue.waiting.append(job)
+                return future
+            else:
+                METRICS.inc("inference_rejected_total", model=model_name)
+                raise Overloaded(
+                    f"{model_name} has {queue.running} jobs running and "
+                    f"{len(queue.waiting)} waiting; try again later."
+                )
+
+        self._start(model_name, job)
+        return future
+
+    def _start(self, model_name: str, job: Tuple[Future, Callable, tuple, float]) -> None:
+        """
+        Hand a job that holds one of the model's slots to its pool. Jobs
+        whose caller already gave up are skipped, and after shutdown() jobs
+        are cancelled; the slot then goes to the next waiting job.
+        """
+        while job is not None:
+            future, fn, args, enqueued_at = job
+            if self._closed:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(CancelledError("inference scheduler is shut down"))
+            elif future.set_running_or_notify_cancel():
+                started_at = time.perf_counter()
+                METRICS.observe("inference_queue_wait_seconds", started_at - enqueued_at, model=model_name)
+                pool = self._pool_for(model_name)
+                try:
+                    inner = pool.submit(fn, *args)
+                except Exception as e:
+                    self._pool_failed(pool, e)
+                    future.set_exception(e)
+                else:
+                    inner.add_done_callback(
+                        lambda inner, pool=pool, future=future, t0=started_at: self._finish(
+                            model_name, pool, future, inner, t0
+                        )
+                    )
+                    return
+            job = self._next_job(model_name)
+
+    def _finish(
+        self, model_name: str, pool: Executor, future: Future, inner: Future, started_at: float
+    ) -> None:
+        METRICS.observe("inference_run_seconds", time.perf_counter() - started_at, model=model_name)
+        next_job = self._next_job(model_name)
+        try:
+            if inner.cancelled():
+                # shutdown() dropped it before it ran; the caller's future is
+                # already running, so it gets the CancelledError instead
+                future.set_exception(CancelledError(f"{model_name} job cancelled by shutdown"))
+                return
+            error = inner.exception()
+            if error is None:
+                future.set_result(inner.result())
+            else:
+                self._pool_failed(pool, error)
+                future.set_exception(error)
+        finally:
+            self._start(model_name, next_job)
+
+    def _next_job(self, model_name: str):
+        """
+        Pass the finishing job's slot to the next waiting job, or free it.
+        """
+        queue = self._queues[model_name]
+        with self._lock:
+            if queue.waiting:
+                return queue.waiting.popleft()
+            queue.running -= 1
+            return None
+
+    def _pool_failed(self, pool: Executor, error: BaseException) -> None:
+        # A worker process died; its pool refuses all further work, so the
+        # next job starts a fresh one
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                if self._process_pool is not pool:
+                    return
+                self._process_pool = None
+            print(f"Inference process pool broke ({error!r}); starting a new one")
+
+    def depths(self) -> Dict[str, Tuple[int, int]]:
+        """
+        model -> (jobs running, jobs waiting).
+        """
+        with self._lock:
+            return {name: (q.running, len(q.waiting)) for name, q in self._queues.items()}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            pools = [self._thread_pool, self._process_pool]
+            self._thread_pool = self._process_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+SCHEDULER = InferenceScheduler()
@@ -22,6 +22,28 @@ class PredictionResponse(BaseModel):
     probabilities: Dict[str, float]
 
 
+# Batch prediction schemas
+class BatchPredictionRequest(BaseModel):
+    tickers: List[str]
+    model_names: List[str]
+    # Either a single date or an inclusive start/end range ("YYYY-MM-DD")
+    date: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+class BatchModelPredictions(BaseModel):
+    decisions: List[Decision]             # one per row
+    probabilities: Dict[str, List[float]]  # "BUY"/"HOLD"/"SELL" -> one per row
+
+
+class BatchPredictionResponse(BaseModel):
+    # Columnar layout: row i is (tickers[i], dates[i]) for every model
+    tickers: List[str]
+    dates: List[str]
+    predictions: Dict[str, BatchModelPredictions]
+
+
 # New schemas for model evaluation metrics
 class ModelMetric(BaseModel):
     name: str                     # e.g. "random_forest", "quantum_qnn"
@@ -36,3 +58,60 @@ class ModelMetric(BaseModel):
 
 class MetricsResponse(BaseModel):
     metrics: List[ModelMetric]
+
+
+class BreakdownGroup(BaseModel):
+    key: str                      # ticker symbol or "YYYY-MM"
+    n_rows: int
+    accuracy_vs_true: Optional[float] = None      # None if no labeled rows
+    agreement_with_rf: float
+    confusion_matrix: List[List[int]]             # [true][predicted], BUY/HOLD/SELL order
+    label_distribution: Dict[Decision, int]       # true-label counts
+
+
+class BreakdownResponse(BaseModel):
+    by: Literal["ticker", "month"]
+    models: Dict[str, List[BreakdownGroup]]
+
+
+class BacktestPoint(BaseModel):
+    month: str                    # test month, "YYYY-MM"
+    train_start: str
+    train_end: str
+    n_train: int                  # 0 for quantum models (not refit)
+    n_test: int
+    accuracy: Optional[float] = None
+    confusion_matrix: List[List[int]]             # [true][predicted]
+    decision_distribution: Dict[Decision, int]
+    fit_seconds: float
+    cached: bool                  # window model came from the backtest cache
+
+
+class BacktestResponse(BaseModel):
+    params: Dict[str, Optional[object]]
+    models: Dict[str, List[BacktestPoint]]
+
+
+class SimulationStats(BaseModel):
+    total_return: float
+    annualized_return: float
+    annualized_volatility: float
+    sharpe: float
+    max_drawdown: float           # most negative equity / running peak - 1
+    turnover: float               # mean daily sum of |position change|
+    exposure: float               # mean gross position
+
+
+class EquityCurve(BaseModel):
+    dates: List[str]
+    equity: List[float]
+    drawdown: List[float]
+
+
+class SimulationResponse(BaseModel):
+    model_name: str
+    params: Dict[str, object]
+    portfolio: SimulationStats
+    buy_and_hold: SimulationStats  # equal-weight long benchmark
+    tickers: Dict[str, SimulationStats]
+    equity_curve: EquityCurve
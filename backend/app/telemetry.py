@@ -0,0 +1,279 @@
+"""
+In-process latency histograms and counters, exported as Prometheus text.
+
+Recording a sample is a bisect into fixed bucket bounds plus a few integer
+adds under a lock (about 2us per stage() block), so it stays on in production:
+
+    with stage("/api/predict", "inference", model="logreg"):
+        ...
+
+RequestMetricsMiddleware counts every request and times it per endpoint;
+whatever part of a request no stage() covered (routing, request parsing,
+response validation and JSON encoding) is recorded as the "framework" stage
+of that endpoint. GET /api/metrics renders everything with render().
+
+Each uvicorn worker keeps its own numbers; scrape every worker (or sum them)
+for a whole-server view.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, roughly x2.5 apart: 1us .. 10s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    1e-6, 2.5e-6, 5e-6,
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+# For histograms of counts rather than seconds (e.g. rows per micro-batch)
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Seconds spent in stage() during the current request, read by the middleware
+_REQUEST_STAGE_SECONDS: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "request_stage_seconds", default=None
+)
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram with count and sum. Quantiles are
+    estimated by linear interpolation inside the bucket that holds them.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Registry:
+    """
+    Named families of labeled counters and histograms. One lock for the whole
+    registry: every update is a handful of operations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+
+    def describe(self, name: str, text: str, buckets: Optional[Sequence[float]] = None) -> None:
+        """
+        HELP text for a metric, and for a histogram its bucket bounds
+        (LATENCY_BUCKETS unless given).
+        """
+        self._help[name] = text
+        if buckets is not None:
+            self._buckets[name] = tuple(buckets)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            family[key] = family.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self.observe_key(name, tuple(sorted(labels.items())), value)
+
+    def observe_key(self, name: str, key: Labels, value: float) -> None:
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            hist = family.get(key)
+            if hist is None:
+                hist = family[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        count / mean / quantiles per labeled histogram, as plain dicts
+        (JSON-friendly; used by the benchmarks and for debugging).
+        """
+        with self._lock:
+            return {
+                name: {
+                    _format_labels(key): {
+                        "count": hist.count,
+                        "mean": hist.sum / hist.count if hist.count else 0.0,
+                        **{f"p{int(q * 100)}": hist.quantile(q) for q in QUANTILES},
+                    }
+                    for key, hist in family.items()
+                }
+                for name, family in self._histograms.items()
+            }
+
+    def render(self, gauges: Optional[Dict[str, Dict[Labels, float]]] = None) -> str:
+        """
+        Prometheus text exposition: counters, histograms (plus estimated
+        quantiles as <name>_quantile gauges) and any extra gauges.
+        """
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, family in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in sorted(family.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+            for name, family in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for key, hist in sorted(family.items()):
+                    bounds = [f"{b:g}" for b in hist.buckets] + ["+Inf"]
+                    cumulative = 0
+                    for bound, n in zip(bounds, hist.counts):
+                        cumulative += n
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:.9g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+
+                lines.append(f"# TYPE {name}_quantile gauge")
+                for key, hist in sorted(family.items()):
+                    for q in QUANTILES:
+                        lines.append(
+                            f"{name}_quantile{_format_labels(key + (('quantile', str(q)),))} "
+                            f"{hist.quantile(q):.9g}"
+                        )
+
+        for name, family in sorted((gauges or {}).items()):
+            header(name, "gauge")
+            for key, value in sorted(family.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:.9g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+METRICS = Registry()
+METRICS.describe("http_requests_total", "Requests by method, endpoint and status code.")
+METRICS.describe("http_request_duration_seconds", "Request latency by method and endpoint.")
+METRICS.describe("stage_duration_seconds", "Time per request stage by endpoint and model.")
+METRICS.describe("load_duration_seconds", "Time to load data and model artifacts.")
+
+
+class stage:
+    """
+    Time the enclosed block as stage `name` of `endpoint` for `model`.
+
+    A plain class rather than a @contextmanager generator: it is entered
+    several times per request, and this halves its cost.
+    """
+
+    __slots__ = ("key", "t0")
+
+    def __init__(self, endpoint: str, name: str, model: str = ""):
+        # Same order observe() sorts label names into
+        self.key = (("endpoint", endpoint), ("model", model), ("stage", name))
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        seconds = time.perf_counter() - self.t0
+        METRICS.observe_key("stage_duration_seconds", self.key, seconds)
+        spent = _REQUEST_STAGE_SECONDS.get()
+        if spent is not None:
+            spent[0] += seconds
+
+
+@contextmanager
+def timed_load(loader: str) -> Iterator[None]:
+    """
+    Time one data / model load (feature index, panel, a model, ...).
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe("load_duration_seconds", time.perf_counter() - t0, loader=loader)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware: request counter and latency histogram per endpoint
+    (the route's path template, so /api/x/{id} is one series), plus the
+    "framework" stage described in the module docstring.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        spent = [0.0]
+        token = _REQUEST_STAGE_SECONDS.set(spent)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - t0
+            _REQUEST_STAGE_SECONDS.reset(token)
+
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            METRICS.inc("http_requests_total", method=method, endpoint=endpoint, status=str(status["code"]))
+            METRICS.observe("http_request_duration_seconds", seconds, method=method, endpoint=endpoint)
+            if spent[0] > 0:
+                METRICS.observe(
+                    "stage_duration_seconds",
+                    max(seconds - spent[0], 0.0),
+                    endpoint=endpoint,
+                    stage="framework",
+                    model="",
+                )
@@ -0,0 +1,27 @@
+"""
+Per-process state for the offline process pools (evaluate_models.py,
+app.models.backtest).
+
+Each worker loads what it needs once, in the pool's initializer, into a
+module-level dict; tasks then only carry row ranges and model names:
+
+    _WORKER: Dict[str, Any] = {}
+
+    def _init_worker() -> None:
+        init_worker_state(_WORKER)
+        _WORKER["index"] = load_feature_index()
+"""
+
+from typing import Any, Dict
+
+from threadpoolctl import threadpool_limits
+
+
+def init_worker_state(state: Dict[str, Any]) -> None:
+    """
+    Reset `state` and cap the worker at one BLAS/OpenMP thread, since the
+    parallelism comes from the pool. The limit is kept in `state` so it
+    lasts as long as the worker.
+    """
+    state.clear()
+    state["limits"] = threadpool_limits(limits=1)
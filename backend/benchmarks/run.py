@@ -0,0 +1,405 @@
+"""
+Benchmarks for the data loading, inference and training paths.
+
+Everything runs offline on the committed data/processed CSVs (through the
+compiled feature store) and the models in models/; nothing is written to
+models/. Run from backend/:
+
+    python -m benchmarks.run [--quick] [--suites load inference quantum qnn_epoch training]
+        [--repeat N] [--train-rows N] [--no-save]
+
+Suites:
+  load        cold (fresh interpreter) load_or_build_all_data, feature index
+              and raw CSV parse times
+  inference   single-row latency (p50/p90/p99) and batch throughput of each
+              of the five models, through the same calls the API makes
+  quantum     VQC / QNN batch kernels vs. the Qiskit / PennyLane reference
+              circuits they replace, in rows per second
+  qnn_epoch   one train_quantum_qnn epoch (weights are not saved)
+  training    shared load/split/scale phases and the fit time of each
+              classical model on a subsample of the training split
+
+Each run is appended to benchmarks/history.json together with the git SHA
+and the environment, and compared against the previous entry: timings that
+got worse by more than --threshold are flagged.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+HISTORY_PATH = BENCH_DIR / "history.json"
+
+SUITES = ["load", "inference", "quantum", "qnn_epoch", "training"]
+SEED = 42
+
+
+def _latency(fn: Callable[[], Any], repeat: int, warmup: int = 3) -> Dict[str, float]:
+    """
+    Per-call wall time of fn() over `repeat` calls, in seconds.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    return {
+        "calls": repeat,
+        "mean_seconds": float(samples.mean()),
+        "p50_seconds": float(np.percentile(samples, 50)),
+        "p90_seconds": float(np.percentile(samples, 90)),
+        "p99_seconds": float(np.percentile(samples, 99)),
+    }
+
+
+def _throughput(fn: Callable[[], Any], n_rows: int, repeat: int) -> Dict[str, float]:
+    """
+    Best-of-`repeat` time for one call over n_rows rows.
+    """
+    fn()
+    best = min(_time_once(fn) for _ in range(repeat))
+    return {"rows": n_rows, "seconds": best, "rows_per_second": n_rows / best}
+
+
+def _time_once(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _cold(code: str, repeat: int) -> Dict[str, float]:
+    """
+    Run `code` in fresh interpreters; it prints {"import": s, "call": s}.
+    Returns the median of each over `repeat` runs.
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "PYTHONPATH": str(BACKEND_DIR)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "runs": repeat,
+        "import_seconds": float(np.median([r["import"] for r in runs])),
+        "call_seconds": float(np.median([r["call"] for r in runs])),
+    }
+
+
+_COLD_TEMPLATE = """
+import json, time
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+{call}
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "call": t2 - t1}}))
+"""
+
+
+def bench_load(args) -> Dict[str, Any]:
+    cases = {
+        "load_or_build_all_data": (
+            "from app.data.load_data import load_or_build_all_data",
+            "load_or_build_all_data()",
+        ),
+        "load_feature_index": (
+            "from app.data.feature_index import load_feature_index",
+            "load_feature_index().fingerprint()",
+        ),
+        # What load_or_build_all_data falls back to without a feature store
+        "parse_processed_csvs": (
+            "import pandas as pd\nfrom app.data.load_data import PROCESSED_DIR",
+            "pd.concat([pd.read_csv(p) for p in sorted(PROCESSED_DIR.glob('*_features_labels.csv'))])",
+        ),
+    }
+    results = {}
+    for name, (imports, call) in cases.items():
+        results[name] = _cold(_COLD_TEMPLATE.format(imports=imports, call=call), args.cold_repeat)
+        print(f"  {name}: {results[name]['call_seconds']:.3f}s (+{results[name]['import_seconds']:.2f}s imports)")
+    return results
+
+
+def bench_inference(args) -> Dict[str, Any]:
+    from app.data.feature_index import load_feature_index
+    from app.models.decision import predict_with_hold_threshold
+    from app.models.quantum import quantum_qnn_predict, quantum_vqc_predict
+    from app.models.registry import CLASSICAL_MODEL_NAMES, MODEL_NAMES, load_model, score_batch
+
+    index = load_feature_index()
+    rng = np.random.default_rng(SEED)
+    single_rows = rng.integers(0, len(index), size=args.repeat)
+
+    results: Dict[str, Any] = {}
+    for name in MODEL_NAMES:
+        try:
+            t0 = time.perf_counter()
+            model = load_model(name)
+            load_seconds = time.perf_counter() - t0
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"  {name}: skipped ({e})")
+            continue
+
+        # The API's live (uncached, no prediction table) single-row path
+        if name in CLASSICAL_MODEL_NAMES:
+            single = lambda X: predict_with_hold_threshold(model, X)
+        elif name == "quantum_vqc":
+            single = quantum_vqc_predict
+        else:
+            single = quantum_qnn_predict
+
+        it = iter(np.resize(single_rows, args.repeat + 3))
+        entry: Dict[str, Any] = {
+            "load_seconds": load_seconds,
+            "single": _latency(lambda: single(index.feature_row(int(next(it)))), args.repeat),
+            "batch": {},
+        }
+        for size in args.batch_sizes:
+            X = index.feature_rows(np.sort(rng.choice(len(index), size=size, replace=False)))
+            entry["batch"][str(size)] = _throughput(lambda: score_batch(name, model, X), size, args.batch_repeat)
+
+        results[name] = entry
+        largest = entry["batch"][str(args.batch_sizes[-1])]
+        print(
+            f"  {name}: single p50 {entry['single']['p50_seconds'] * 1e6:.0f}us, "
+            f"p99 {entry['single']['p99_seconds'] * 1e6:.0f}us; "
+            f"batch of {args.batch_sizes[-1]}: {largest['rows_per_second']:,.0f} rows/s"
+        )
+    return results
+
+
+def bench_quantum(args) -> Dict[str, Any]:
+    from app.data.feature_index import load_feature_index
+    from app.models.quantum import (
+        _load_qnn_weights,
+        _pl_qnn_circuit,
+        _prepare_angles,
+        _qiskit_vqc_probs,
+        quantum_qnn_predict_batch,
+        quantum_vqc_predict_batch,
+    )
+
+    index = load_feature_index()
+    rng = np.random.default_rng(SEED)
+    X = index.feature_rows(np.sort(rng.choice(len(index), size=args.kernel_rows, replace=False)))
+    X_ref = X[: args.reference_rows]
+    weights = _load_qnn_weights()
+
+    results = {
+        "vqc_kernel": _throughput(lambda: quantum_vqc_predict_batch(X), len(X), args.batch_repeat),
+        "qnn_kernel": _throughput(lambda: quantum_qnn_predict_batch(X), len(X), args.batch_repeat),
+        "vqc_qiskit_reference": _throughput(
+            lambda: [_qiskit_vqc_probs(x) for x in X_ref], len(X_ref), 1
+        ),
+        "qnn_pennylane_reference": _throughput(
+            lambda: [_pl_qnn_circuit(_prepare_angles(x, num_qubits=2), weights) for x in X_ref],
+            len(X_ref),
+            1,
+        ),
+    }
+    for name, r in results.items():
+        print(f"  {name}: {r['rows_per_second']:,.0f} rows/s")
+    return results
+
+
+def bench_qnn_epoch(args) -> Dict[str, Any]:
+    import pennylane as qml
+    import pennylane.numpy as pnp
+
+    from train_quantum_qnn import load_training_data, run_epoch
+
+    A, Y = load_training_data(max_samples=args.qnn_samples, seed=SEED)
+    opt = qml.GradientDescentOptimizer(stepsize=0.2)
+    weights = pnp.array([0.1, -0.1], requires_grad=True)
+    rng = np.random.default_rng(SEED)
+
+    t0 = time.perf_counter()
+    run_epoch(weights, opt, A, Y, batch_size=4096, rng=rng)
+    seconds = time.perf_counter() - t0
+
+    result = {"samples": int(A.shape[0]), "batch_size": 4096, "epoch_seconds": seconds,
+              "rows_per_second": A.shape[0] / seconds}
+    print(f"  epoch over {A.shape[0]} samples: {seconds:.2f}s ({result['rows_per_second']:,.0f} rows/s)")
+    return result
+
+
+def bench_training(args) -> Dict[str, Any]:
+    from threadpoolctl import threadpool_limits
+
+    from app.models.classical import (
+        DEFAULT_CLASSICAL_MODELS,
+        _build_classifier,
+        _fit_classifier,
+        prepare_training_data,
+    )
+
+    data = prepare_training_data()
+    results: Dict[str, Any] = {"shared_phases": data["timings"], "models": {}}
+
+    n_jobs = os.cpu_count() or 1
+    rng = np.random.default_rng(SEED)
+    n_rows = min(args.train_rows, len(data["y_train"]))
+    keep = rng.choice(len(data["y_train"]), size=n_rows, replace=False)
+    X, y = data["X_train"][keep], data["y_train"][keep]
+
+    for name in DEFAULT_CLASSICAL_MODELS:
+        timings: Dict[str, float] = {}
+        with threadpool_limits(limits=n_jobs):
+            _fit_classifier(name, _build_classifier(name, n_jobs=n_jobs), X, y, timings)
+        results["models"][name] = {"rows": n_rows, "n_jobs": n_jobs, "phases": timings}
+        print(f"  {name}: {sum(timings.values()):.2f}s on {n_rows} rows ({n_jobs} CPU)")
+    return results
+
+
+def _git_info() -> Dict[str, Any]:
+    def git(*cmd: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *cmd], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"sha": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def _environment() -> Dict[str, Any]:
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scikit_learn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _flatten(tree: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Timings (…seconds) that grew and throughputs (…per_second) that shrank by
+    more than `threshold` (a fraction) since the previous run.
+    """
+    before, after = _flatten(previous["results"]), _flatten(current["results"])
+    flagged = []
+    for key, new in sorted(after.items()):
+        old = before.get(key)
+        if not old or key.endswith("calls") or key.endswith("rows"):
+            continue
+        if key.endswith("per_second"):
+            change = old / new - 1.0 if new else float("inf")
+        elif key.endswith("seconds"):
+            if key.rsplit(".", 1)[0] + ".rows_per_second" in after:
+                continue  # the same measurement, already checked as a rate
+            change = new / old - 1.0
+        else:
+            continue
+        if change > threshold:
+            flagged.append(f"{key}: {old:.6g} -> {new:.6g} ({change:+.0%} worse)")
+    return flagged
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Benchmark loading, inference and training.")
+    parser.add_argument("--suites", nargs="*", default=SUITES, choices=SUITES)
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and smaller samples")
+    parser.add_argument("--repeat", type=int, default=None, help="Single-row calls per model")
+    parser.add_argument("--train-rows", type=int, default=None, help="Rows each classical model is fitted on")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Flag changes worse than this fraction")
+    parser.add_argument("--no-save", action="store_true", help="Do not append to the history file")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    args = parser.parse_args(argv)
+
+    # Sizes: (full run, --quick)
+    def pick(full, quick):
+        return quick if args.quick else full
+
+    args.repeat = args.repeat or pick(2000, 200)
+    args.train_rows = args.train_rows or pick(50_000, 10_000)
+    args.cold_repeat = pick(3, 1)
+    args.batch_repeat = pick(5, 2)
+    args.batch_sizes = [256, 4096]
+    args.kernel_rows = pick(65_536, 16_384)
+    args.reference_rows = pick(500, 100)
+    args.qnn_samples = pick(None, 20_000)  # None: the full dataset, like a real epoch
+
+    entry: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_info(),
+        "environment": _environment(),
+        "params": {
+            "quick": args.quick,
+            "repeat": args.repeat,
+            "train_rows": args.train_rows,
+            "batch_sizes": args.batch_sizes,
+            "kernel_rows": args.kernel_rows,
+            "reference_rows": args.reference_rows,
+            "qnn_samples": args.qnn_samples,
+        },
+        "results": {},
+    }
+    runners = {
+        "load": bench_load,
+        "inference": bench_inference,
+        "quantum": bench_quantum,
+        "qnn_epoch": bench_qnn_epoch,
+        "training": bench_training,
+    }
+    for suite in args.suites:
+        print(f"[{suite}]")
+        t0 = time.perf_counter()
+        entry["results"][suite] = runners[suite](args)
+        print(f"[{suite}] done in {time.perf_counter() - t0:.1f}s")
+
+    history: List[Dict[str, Any]] = []
+    if args.history.exists():
+        history = json.load(args.history.open("r"))
+
+    # Compare against the last run with the same settings
+    previous = next((h for h in reversed(history) if h["params"] == entry["params"]), None)
+    if previous is not None:
+        flagged = compare(previous, entry, args.threshold)
+        sha = (previous["git"]["sha"] or "?")[:10]
+        print(f"Compared with {sha} ({previous['timestamp']}): {len(flagged)} regression(s)")
+        for line in flagged:
+            print(f"  REGRESSION {line}")
+
+    if not args.no_save:
+        history.append(entry)
+        with args.history.open("w") as f:
+            json.dump(history, f, indent=2)
+        print(f"Appended results to {args.history}")
+    return entry
+
+
+if __name__ == "__main__":
+    main()
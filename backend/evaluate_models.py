@@ -2,33 +2,48 @@
 """
 Evaluate all models (classical + quantum) on the full dataset.
 
+Decisions use the same rules as the API (app.models.decision): the
+HOLD-threshold rule for classical models, most likely class for quantum ones.
+
 Metrics:
 - Accuracy vs TRUE labels
 - Agreement with Random Forest baseline (treat RF as "oracle")
+- Confusion matrix vs TRUE labels (rows true, columns predicted)
+- Scoring throughput (rows/sec) per model
 - Quantum model metadata: logical depth and anticipated shots
+- All of the above except throughput per ticker and per month, written to
+  models/metrics_breakdown.npz (see app.breakdown)
+
+The feature index is split into row chunks that worker processes score with
+every model. Each finished chunk only contributes (ticker, month) count
+arrays, which are checkpointed to disk, so an interrupted run picks up where
+it stopped:
+
+    python evaluate_models.py [--workers N] [--chunk-rows N] [--fresh]
 """
 
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import argparse
 import json
+import os
+import shutil
+import time
 
 import numpy as np
-from sklearn.metrics import accuracy_score
-
-from app import config
-from app.data.load_data import load_or_build_all_data
-from app.models.classical import (
-    get_random_forest_model,
-    get_logreg_model,
-    get_svm_model,
-)
-from app.models.quantum import (
-    quantum_vqc_predict,
-    quantum_qnn_predict,
-    MODELS_DIR,  # <- reuse same models/ directory as quantum.py
-)
+
+from app.cache import artifact_fingerprint
+from app.breakdown import grouped_counts, month_codes, save_breakdown
+from app.data.feature_index import load_feature_index
+from app.data.feature_store import chunk_bounds
+from app.models.classical import SVM_SVC_MODEL_PATH, get_svm_svc_model
+from app.models.decision import predict_with_hold_threshold
+from app.models.quantum import MODELS_DIR  # <- reuse same models/ directory as quantum.py
+from app.models.registry import MODEL_NAMES, load_model, model_version, score_batch
+from app.workers import init_worker_state
 
 QUANTUM_METADATA: Dict[str, Dict[str, int]] = {
     "quantum_vqc": {
@@ -43,83 +58,227 @@ QUANTUM_METADATA: Dict[str, Dict[str, int]] = {
 
 TRAIN_TIMES_PATH = MODELS_DIR / "train_times.json"
 METRICS_PATH = MODELS_DIR / "metrics.json"
+CHECKPOINT_DIR = MODELS_DIR / "eval_checkpoint"
+
+DEFAULT_CHUNK_ROWS = 32_768
+
+# Filled by _init_worker (app.workers)
+_WORKER: Dict[str, Any] = {}
 
 
 def _load_train_times() -> Dict[str, float]:
+    """
+    Total training seconds per model. Entries are either a plain number or
+    {"total_seconds": ..., "phases": {...}} as written by retrain.py.
+    """
     if TRAIN_TIMES_PATH.exists():
         try:
-            return json.load(TRAIN_TIMES_PATH.open("r"))
+            raw = json.load(TRAIN_TIMES_PATH.open("r"))
         except Exception:
             return {}
+        return {
+            name: float(t["total_seconds"] if isinstance(t, dict) else t)
+            for name, t in raw.items()
+        }
     return {}
 
 
-def _predict_quantum_batch(X: np.ndarray, which: str) -> np.ndarray:
+def _eval_model_names() -> List[str]:
     """
-    Run quantum model on each sample in X.
-
-    which: "quantum_vqc" or "quantum_qnn"
+    Random Forest first (the other models are compared against it), then the
+    rest; the legacy libsvm engine only if it was trained
+    (python retrain.py --models svm_linear_svc).
     """
-    if which == "quantum_vqc":
-        qfunc = quantum_vqc_predict
-    elif which == "quantum_qnn":
-        qfunc = quantum_qnn_predict
-    else:
-        raise ValueError(f"Unknown quantum model: {which}")
+    names = list(MODEL_NAMES)
+    if SVM_SVC_MODEL_PATH.exists():
+        names.append("svm_linear_svc")
+    return names
 
-    preds = []
-    for i in range(X.shape[0]):
-        probs = qfunc(X[i])
-        decision = max(probs, key=probs.get)
-        preds.append(decision)
 
-    return np.array(preds)
+def _eval_versions(model_names: List[str]) -> Dict[str, Any]:
+    versions = {}
+    for name in model_names:
+        if name == "svm_linear_svc":
+            version = artifact_fingerprint([SVM_SVC_MODEL_PATH])
+        else:
+            version = model_version(name)
+        versions[name] = [list(part) for part in version]
+    return versions
 
 
-def evaluate_all() -> Dict[str, Any]:
-    print("Loading full dataset for evaluation...")
-    df = load_or_build_all_data()
+def _init_worker(model_names: List[str], prefer_flat_forest: bool) -> None:
+    """
+    Load the index and every model once per worker. The feature store is a
+    memory map shared by all workers; with several workers the Random Forest
+    is too (flat export), instead of one private unpickled copy each.
+    """
+    init_worker_state(_WORKER)
 
-    X = df[config.FEATURE_COLS].values.astype(float)
-    y_true = df["label"].values
+    index = load_feature_index()
+    ticker_codes, date_codes = index.row_coordinates()
+    months, date_month = month_codes(index.dates)
 
-    print(f"Total samples: {X.shape[0]}")
-    print(f"Feature columns: {config.FEATURE_COLS}")
-    print()
+    _WORKER["index"] = index
+    _WORKER["ticker_codes"] = ticker_codes
+    _WORKER["month_codes"] = np.where(date_codes >= 0, date_month[date_codes], -1)
+    _WORKER["n_months"] = len(months)
+    _WORKER["models"] = {
+        name: get_svm_svc_model()
+        if name == "svm_linear_svc"
+        else load_model(name, prefer_flat_forest=prefer_flat_forest)
+        for name in model_names
+    }
 
-    # classical models
-    print("Loading classical models (from saved .pkl files)...")
-    rf = get_random_forest_model()
-    logreg = get_logreg_model()
-    svm = get_svm_model()
 
-    print("Computing predictions for classical models...")
-    y_rf = rf.predict(X)
-    y_logreg = logreg.predict(X)
-    y_svm = svm.predict(X)
+def _evaluate_chunk(start: int, stop: int) -> Dict[str, np.ndarray]:
+    """
+    Score rows [start, stop) with every model. Returns flat arrays for the
+    chunk's .npz: per model the (ticker, month) confusion and RF agreement
+    counts and the seconds spent scoring, plus the row counts.
+    """
+    index = _WORKER["index"]
+    X = np.asarray(index.features[start:stop])
+    y_true = np.asarray(index.label_codes[start:stop]).astype(np.int64)
+    tickers = _WORKER["ticker_codes"][start:stop]
+    months = _WORKER["month_codes"][start:stop]
+    shape = (len(index.tickers), _WORKER["n_months"])
+
+    result: Dict[str, np.ndarray] = {}
+    rf_codes = None
+    for name, model in _WORKER["models"].items():
+        t0 = time.perf_counter()
+        if model is None:
+            codes, _ = score_batch(name, None, X)
+        else:
+            codes, _ = predict_with_hold_threshold(model, X)
+        seconds = time.perf_counter() - t0
+
+        codes = codes.astype(np.int64)
+        if rf_codes is None:
+            rf_codes = codes
+
+        confusion, agree, n_rows = grouped_counts(
+            tickers, months, y_true, codes, rf_codes, *shape
+        )
+        result[f"{name}.confusion"] = confusion
+        result[f"{name}.agree"] = agree
+        result[f"{name}.seconds"] = np.float64(seconds)
+    result["n_rows"] = n_rows
+    return result
 
-    metrics: Dict[str, Dict[str, Any]] = {}
 
-    def add_metrics(name_key: str, y_pred: np.ndarray):
-        metrics.setdefault(name_key, {})
-        metrics[name_key]["accuracy_vs_true"] = float(
-            accuracy_score(y_true, y_pred)
-        )
-        metrics[name_key]["agreement_with_rf"] = float(
-            accuracy_score(y_rf, y_pred)
-        )
+def _chunk_path(chunk: int) -> Path:
+    return CHECKPOINT_DIR / f"chunk_{chunk}.npz"
 
-    add_metrics("random_forest", y_rf)
-    add_metrics("logreg", y_logreg)
-    add_metrics("svm_linear", y_svm)
 
-    # quantum models
-    print("\nRunning quantum models (this may be slower)...")
-    y_vqc = _predict_quantum_batch(X, "quantum_vqc")
-    y_qnn = _predict_quantum_batch(X, "quantum_qnn")
+def _open_checkpoint(expected: Dict[str, Any], resume: bool) -> List[int]:
+    """
+    Chunks finished by a previous run over the same rows, chunking and model
+    versions. Starts a new checkpoint otherwise.
+    """
+    meta_path = CHECKPOINT_DIR / "meta.json"
+    if resume and meta_path.exists():
+        try:
+            meta = json.load(meta_path.open("r"))
+        except Exception as e:
+            meta = None
+            print(f"Ignoring unreadable checkpoint {CHECKPOINT_DIR}: {e!r}")
+        if meta == expected:
+            return sorted(int(p.stem.split("_")[1]) for p in CHECKPOINT_DIR.glob("chunk_*.npz"))
+        if meta is not None:
+            print(f"Ignoring checkpoint {CHECKPOINT_DIR}: data or models changed")
+
+    if CHECKPOINT_DIR.exists():
+        shutil.rmtree(CHECKPOINT_DIR)
+    CHECKPOINT_DIR.mkdir(parents=True)
+    with meta_path.open("w") as f:
+        json.dump(expected, f)
+    return []
+
+
+def _save_chunk(chunk: int, arrays: Dict[str, np.ndarray]) -> None:
+    tmp = _chunk_path(chunk).with_suffix(".tmp")
+    with tmp.open("wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, _chunk_path(chunk))
+
+
+def evaluate_all(
+    workers: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    resume: bool = True,
+) -> Dict[str, Any]:
+    print("Loading feature index for evaluation...")
+    index = load_feature_index()
+    n_rows = len(index)
+    model_names = _eval_model_names()
+
+    print(f"Total samples: {n_rows}")
+    print(f"Models: {model_names}")
+    print()
+
+    expected = {
+        "index_fingerprint": index.fingerprint(),
+        "chunk_rows": chunk_rows,
+        "versions": _eval_versions(model_names),
+    }
+    done = set(_open_checkpoint(expected, resume))
+
+    bounds = chunk_bounds(n_rows, chunk_rows)
+    todo = [c for c in range(len(bounds)) if c not in done]
+    print(f"{len(done)} of {len(bounds)} chunks already done; scoring {len(todo)}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(todo)))
+
+    t0 = time.perf_counter()
+    if todo:
+        # A single worker gets sklearn's faster bulk traversal; several share
+        # the memory-mapped forest
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(model_names, workers > 1)
+        ) as pool:
+            futures = {pool.submit(_evaluate_chunk, *bounds[c]): c for c in todo}
+            for fut in as_completed(futures):
+                c = futures[fut]
+                _save_chunk(c, fut.result())
+                done.add(c)
+                print(f"Chunk {c} ({bounds[c][1] - bounds[c][0]} rows) done, {len(done)}/{len(bounds)}")
+    print(f"Scored {len(todo)} chunks in {time.perf_counter() - t0:.1f}s")
+
+    # Sum the per-chunk (ticker, month) counts
+    months, _ = month_codes(index.dates)
+    cell_shape = (len(index.tickers), len(months))
+    confusion = np.zeros((len(model_names), *cell_shape, 3, 3), dtype=np.int64)
+    agree = np.zeros((len(model_names), *cell_shape), dtype=np.int64)
+    counts = np.zeros(cell_shape, dtype=np.int64)
+    seconds = np.zeros(len(model_names))
+    for c in range(len(bounds)):
+        with np.load(_chunk_path(c)) as chunk:
+            counts += chunk["n_rows"]
+            for j, name in enumerate(model_names):
+                confusion[j] += chunk[f"{name}.confusion"]
+                agree[j] += chunk[f"{name}.agree"]
+                seconds[j] += chunk[f"{name}.seconds"]
+
+    save_breakdown(model_names, index.tickers, months, confusion, agree, counts)
 
-    add_metrics("quantum_vqc", y_vqc)
-    add_metrics("quantum_qnn", y_qnn)
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for j, name in enumerate(model_names):
+        total = confusion[j].sum(axis=(0, 1))
+        metrics[name] = {
+            "accuracy_vs_true": float(np.trace(total) / total.sum()),
+            "agreement_with_rf": float(agree[j].sum() / counts.sum()),
+            "confusion_matrix": total.tolist(),
+            "eval_rows_per_second": float(n_rows / seconds[j]) if seconds[j] > 0 else None,
+        }
+        rate = metrics[name]["eval_rows_per_second"]
+        print(
+            f"{name}: accuracy {metrics[name]['accuracy_vs_true']:.4f}, "
+            f"agreement with RF {metrics[name]['agreement_with_rf']:.4f}, "
+            + (f"{rate:,.0f} rows/s" if rate is not None else "n/a rows/s")
+        )
 
     # quantum metadata
     for q_name, meta in QUANTUM_METADATA.items():
@@ -143,10 +302,19 @@ def evaluate_all() -> Dict[str, Any]:
         json.dump(metrics, f, indent=2)
     print(f"Saved evaluation metrics to {METRICS_PATH}")
 
+    # Everything the checkpoint held is in metrics.json and the breakdown now
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+
     return metrics
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate every model on the full dataset.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per work unit")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
     root = Path(__file__).resolve().parents[0]
     print(f"Running evaluation from {root}")
-    evaluate_all()
+    evaluate_all(workers=args.workers, chunk_rows=args.chunk_rows, resume=not args.fresh)
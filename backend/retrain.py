@@ -1,11 +1,11 @@
 from pathlib import Path
-import time
+import argparse
 import json
 
 from app.models.classical import (
-    train_and_save_random_forest,
-    train_and_save_logreg,
-    train_and_save_svm_linear,
+    CLASSICAL_MODEL_PATHS,
+    DEFAULT_CLASSICAL_MODELS,
+    train_all_classical,
 )
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -14,29 +14,70 @@ MODELS_DIR.mkdir(parents=True, exist_ok=True)
 TRAIN_TIMES_PATH = MODELS_DIR / "train_times.json"
 
 
+def _parse_cpu_budgets(items):
+    """
+    ["random_forest=6", "logreg=1"] -> {"random_forest": 6, "logreg": 1}
+    Raises ValueError naming the first malformed item or unknown model.
+    """
+    budgets = {}
+    for item in items or []:
+        name, sep, n = item.partition("=")
+        if not sep or not n.strip().isdigit() or int(n) < 1:
+            raise ValueError(f"--cpu-budget expects MODEL=N with N >= 1, got {item!r}")
+        if name not in CLASSICAL_MODEL_PATHS:
+            raise ValueError(
+                f"--cpu-budget: unknown model {name!r} "
+                f"(choose from {', '.join(CLASSICAL_MODEL_PATHS)})"
+            )
+        budgets[name] = int(n)
+    return budgets
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the classical models.")
+    parser.add_argument(
+        "--models",
+        nargs="*",
+        default=list(DEFAULT_CLASSICAL_MODELS),
+        choices=list(CLASSICAL_MODEL_PATHS),
+        help="svm_linear_svc (legacy libsvm engine) is only trained when listed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Models trained concurrently (default: one process per model)",
+    )
+    parser.add_argument(
+        "--cpu-budget",
+        nargs="*",
+        default=None,
+        metavar="MODEL=N",
+        help="Cores per model, e.g. random_forest=6 logreg=1",
+    )
+    args = parser.parse_args()
+    try:
+        cpu_budgets = _parse_cpu_budgets(args.cpu_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
     root = Path(__file__).resolve().parents[0]
     print(f"Running classical retraining from {root}")
 
-    train_times = {}
+    report = train_all_classical(
+        model_names=args.models,
+        max_workers=args.workers,
+        cpu_budgets=cpu_budgets,
+    )
 
-    t0 = time.time()
-    train_and_save_random_forest()
-    t_rf = time.time() - t0
-    print(f"[Timing] Random Forest training time: {t_rf:.3f} seconds")
-    train_times["random_forest"] = t_rf
-
-    t0 = time.time()
-    train_and_save_logreg()
-    t_lr = time.time() - t0
-    print(f"[Timing] Logistic Regression training time: {t_lr:.3f} seconds")
-    train_times["logreg"] = t_lr
-
-    t0 = time.time()
-    train_and_save_svm_linear()
-    t_svm = time.time() - t0
-    print(f"[Timing] Linear SVM training time: {t_svm:.3f} seconds")
-    train_times["svm_linear"] = t_svm
+    train_times = {}
+    for name, entry in report.items():
+        phases = ", ".join(f"{k} {v:.3f}s" for k, v in entry["phases"].items())
+        print(f"[Timing] {name}: {entry['total_seconds']:.3f} seconds ({phases})")
+        train_times[name] = {
+            "total_seconds": entry["total_seconds"],
+            "phases": entry["phases"],
+        }
 
     if TRAIN_TIMES_PATH.exists():
         try:
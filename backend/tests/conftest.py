@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend the way the API and scripts do: `from app ...`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
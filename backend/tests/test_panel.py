@@ -0,0 +1,59 @@
+"""
+Building and loading the dense panel (app.data.panel).
+"""
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from app.data.feature_index import load_feature_index
+from app.data.panel import build_panel, load_panel
+
+
+@pytest.fixture(scope="module")
+def index():
+    try:
+        return load_feature_index()
+    except RuntimeError as e:
+        pytest.skip(f"dataset not available: {e}")
+
+
+def _build(panel_dir) -> None:
+    build_panel(load_feature_index(), panel_dir)
+
+
+def test_load_panel_does_not_build(index, tmp_path):
+    assert load_panel(index, tmp_path / "panel") is None
+    assert not (tmp_path / "panel").exists()
+
+
+def test_build_panel_returns_memory_maps(index, tmp_path):
+    panel = build_panel(index, tmp_path / "panel")
+    assert all(isinstance(getattr(panel, name), np.memmap) for name in ("features", "rows"))
+    assert load_panel(index, tmp_path / "panel") is not None
+
+
+def test_concurrent_builds(index, tmp_path):
+    panel_dir = tmp_path / "panel"
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_build, args=(panel_dir,)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert [p.exitcode for p in procs] == [0, 0, 0]
+    assert load_panel(index, panel_dir) is not None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["panel", "panel.lock"]
+
+
+def test_panel_matches_index(index, tmp_path):
+    panel = build_panel(index, tmp_path / "panel")
+    assert panel.listed_tickers() == index.listed_tickers()
+
+    tickers = index.tickers[:5] + ["NOPE"]
+    for got, want in zip(
+        panel.select(tickers, "2020-01-01", "2020-06-30"),
+        index.select_rows(tickers, "2020-01-01", "2020-06-30"),
+    ):
+        np.testing.assert_array_equal(got, want)
@@ -0,0 +1,52 @@
+"""
+The NumPy batch kernels in app.models.quantum against the Qiskit /
+PennyLane reference circuits they replace.
+"""
+
+import numpy as np
+import pytest
+
+from app.data.feature_index import load_feature_index
+from app.models.quantum import (
+    _load_qnn_weights,
+    _pl_qnn_circuit,
+    _prepare_angles,
+    _prepare_angles_batch,
+    _qiskit_vqc_probs,
+    _qnn_probs_batch,
+    _vqc_probs_batch,
+)
+
+ATOL = 1e-12
+
+
+def _inputs() -> np.ndarray:
+    """
+    Real feature rows, wide random values (tanh saturates) and zeros.
+    """
+    rng = np.random.default_rng(0)
+    try:
+        index = load_feature_index()
+        real = index.feature_rows(np.sort(rng.choice(len(index), size=200, replace=False)))
+    except (FileNotFoundError, RuntimeError):  # no store and no processed CSVs
+        real = np.empty((0, 5))
+    wide = rng.normal(scale=10.0, size=(200, real.shape[1] or 5))
+    zeros = np.zeros((3, wide.shape[1]))
+    return np.vstack([real, wide, zeros])
+
+
+@pytest.fixture(scope="module")
+def X() -> np.ndarray:
+    return _inputs()
+
+
+def test_vqc_kernel_matches_qiskit(X):
+    expected = np.array([_qiskit_vqc_probs(x) for x in X])
+    np.testing.assert_allclose(_vqc_probs_batch(X), expected, rtol=0, atol=ATOL)
+
+
+def test_qnn_kernel_matches_pennylane(X):
+    weights = _load_qnn_weights()
+    expected = np.array([_pl_qnn_circuit(_prepare_angles(x, num_qubits=2), weights) for x in X])
+    got = _qnn_probs_batch(_prepare_angles_batch(X, num_qubits=2), weights)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=ATOL)
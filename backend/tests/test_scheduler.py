@@ -0,0 +1,45 @@
+"""
+Admission and shutdown behaviour of app.scheduler.InferenceScheduler.
+"""
+
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from app.scheduler import InferenceScheduler, Overloaded
+
+
+def test_full_queue_rejects_only_that_model():
+    # logreg's slots and queue are full; svm_linear still gets its own slot
+    scheduler = InferenceScheduler(concurrency={"logreg": 1}, queue_limit=2)
+    release = threading.Event()
+    try:
+        held = [scheduler.submit("logreg", release.wait, 10) for _ in range(3)]
+        assert scheduler.depths()["logreg"] == (1, 2)
+        with pytest.raises(Overloaded):
+            scheduler.submit("logreg", release.wait, 10)
+
+        assert scheduler.submit("svm_linear", sum, [1, 2, 3]).result(timeout=10) == 6
+    finally:
+        release.set()
+    assert [f.result(timeout=10) for f in held] == [True, True, True]
+    scheduler.shutdown()
+
+
+def test_shutdown_resolves_every_job():
+    # One thread for two slots: the second running job waits inside the pool,
+    # where shutdown(cancel_futures=True) cancels it
+    scheduler = InferenceScheduler(threads=1, concurrency={"logreg": 2}, queue_limit=4)
+    release = threading.Event()
+    futures = [scheduler.submit("logreg", release.wait, 10) for _ in range(5)]
+    assert scheduler.depths()["logreg"] == (2, 3)
+
+    scheduler.shutdown()
+    release.set()
+
+    assert futures[0].result(timeout=10) is True
+    for future in futures[1:]:
+        with pytest.raises(CancelledError):
+            future.result(timeout=10)
+    assert scheduler.depths()["logreg"] == (0, 0)
@@ -0,0 +1,77 @@
+"""
+The backtest simulator (app.models.simulator): prices must follow the
+feature index's rows, including when the index is built from the
+per-ticker CSVs, and per-ticker figures only cover days a ticker is held.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import config
+from app.data import feature_store
+from app.data.feature_index import FeatureIndex, load_feature_index
+from app.data.load_data import processed_csv_path
+from app.models.decision import BUY, SELL
+from app.models.simulator import adj_close, simulate
+
+
+@pytest.fixture(scope="module")
+def fallback_index(tmp_path_factory):
+    # No store in an empty dir, and the dataframe loader may not use one either
+    mp = pytest.MonkeyPatch()
+    mp.setattr(feature_store, "load_feature_store", lambda *args, **kwargs: None)
+    try:
+        yield load_feature_index(store_dir=tmp_path_factory.mktemp("no_store"))
+    except RuntimeError as e:
+        pytest.skip(f"processed CSVs not available: {e}")
+    finally:
+        mp.undo()
+
+
+@pytest.mark.parametrize("ticker", ["AAPL", "WMT"])
+def test_fallback_prices_follow_rows(fallback_index, ticker):
+    path = processed_csv_path(ticker)
+    if not path.exists():
+        pytest.skip(f"{path.name} not available")
+    csv = pd.read_csv(path)
+
+    rows = [fallback_index.lookup(ticker, d) for d in csv["Date"].astype(str)]
+    assert None not in rows
+    np.testing.assert_array_equal(adj_close(fallback_index)[rows], csv["Adj Close"].to_numpy())
+
+
+def test_store_and_fallback_prices_agree(fallback_index):
+    store = load_feature_index()
+    if store.fingerprint() != fallback_index.fingerprint():
+        pytest.skip("feature store is not built from the same CSVs")
+
+    # Align by (ticker, date): the two indexes may order tickers differently
+    t_codes, d_codes = store.row_coordinates()
+    t_map = np.array([fallback_index.ticker_pos[t] for t in store.tickers])
+    d_map = np.array([fallback_index.date_pos[d] for d in store.dates])
+    rows = fallback_index.row_index[t_map[t_codes], d_map[d_codes]]
+    assert (rows >= 0).all()
+    np.testing.assert_array_equal(adj_close(fallback_index)[rows], adj_close(store))
+
+
+def test_single_ticker_stats_match_portfolio():
+    # BBB has no rows on days 4-5: its position keeps changing there, but
+    # the portfolio does not hold it, so neither may its own figures
+    dates = pd.bdate_range("2019-01-01", periods=12).strftime("%Y-%m-%d")
+    rng = np.random.default_rng(0)
+    frames = []
+    for ticker, skip in (("AAA", []), ("BBB", [4, 5])):
+        keep = [d for i, d in enumerate(dates) if i not in skip]
+        df = pd.DataFrame({"ticker": ticker, "Date": keep, "label": "BUY"})
+        for col in config.FEATURE_COLS:
+            df[col] = rng.normal(size=len(keep))
+        df["Adj Close"] = 100 * np.cumprod(1 + rng.normal(scale=0.02, size=len(keep)))
+        frames.append(df)
+    index = FeatureIndex.from_dataframe(pd.concat(frames, ignore_index=True))
+    codes = np.full(len(index), BUY, dtype=np.int8)
+    codes[::3] = SELL
+
+    result = simulate(index, adj_close(index), codes, tickers=["BBB"], horizon=2, cost_bps=10)
+    for key, value in result["portfolio"].items():
+        assert result["tickers"]["BBB"][key] == pytest.approx(value), key
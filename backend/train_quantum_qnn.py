@@ -1,4 +1,6 @@
 from pathlib import Path
+from typing import Optional
+import argparse
 import time
 import json
 
@@ -6,9 +8,8 @@ import numpy as onp  # ordinary numpy for I/O
 import pennylane as qml
 import pennylane.numpy as np  # autograd-compatible numpy
 
-from app import config
-from app.data.load_data import load_or_build_all_data
-from app.models.quantum import _prepare_angles, QNN_WEIGHTS_PATH
+from app.data.feature_index import load_feature_index
+from app.models.quantum import _prepare_angles_batch, QNN_WEIGHTS_PATH
 
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -17,39 +18,40 @@ MODELS_DIR.mkdir(parents=True, exist_ok=True)
 TRAIN_TIMES_PATH = MODELS_DIR / "train_times.json"
 
 # Label encoding
-def _encode_labels_to_one_hot(labels):
+def _encode_labels_to_one_hot(label_codes):
     """
-    Map string labels BUY/HOLD/SELL to one-hot vectors [1,0,0], [0,1,0], [0,0,1].
+    Map int label codes (0=BUY, 1=HOLD, 2=SELL, as in app.models.decision)
+    to one-hot vectors [1,0,0], [0,1,0], [0,0,1].
     """
-    mapping = {"BUY": 0, "HOLD": 1, "SELL": 2}
-    idx = [mapping[l] for l in labels]
-    one_hot = np.zeros((len(labels), 3))
-    for i, j in enumerate(idx):
-        one_hot[i, j] = 1.0
-    return one_hot
+    return onp.eye(3)[onp.asarray(label_codes, dtype=int)]
 
 
-def load_training_data(max_samples: int = 2000):
+def load_training_data(max_samples: Optional[int] = None, seed: int = 42):
     """
-    Load feature matrix X and one-hot labels Y for training the QNN.
-    We subsample to max_samples for speed.
+    Load the precomputed angle matrix A (N, 2) and one-hot labels Y (N, 3)
+    for training the QNN.
+
+    Uses the full dataset by default; max_samples draws a random subsample
+    (not just the first rows) when a smaller run is wanted.
     """
     print("Loading data for quantum QNN training...")
-    df = load_or_build_all_data()
-
-    X = df[config.FEATURE_COLS].values.astype(float)
-    y_str = df["label"].values
+    index = load_feature_index()
 
-    # one-hot encode
-    Y = _encode_labels_to_one_hot(y_str)
+    # Angles never change during training, so encode them once up front,
+    # a chunk at a time: only the (N, 2) angles are kept, not the features
+    A = onp.concatenate(
+        [_prepare_angles_batch(X, num_qubits=2) for _, X, _ in index.iter_chunks()]
+    )
+    Y = _encode_labels_to_one_hot(index.label_codes)
 
-    # subsample for speed (optional)
-    n = min(max_samples, X.shape[0])
-    X = X[:n]
-    Y = Y[:n]
+    if max_samples is not None and max_samples < A.shape[0]:
+        rng = onp.random.default_rng(seed)
+        keep = onp.sort(rng.choice(A.shape[0], size=max_samples, replace=False))
+        A = A[keep]
+        Y = Y[keep]
 
-    print(f"Using {n} samples for quantum training.")
-    return X, Y
+    print(f"Using {A.shape[0]} samples for quantum training.")
+    return A, Y
 
 
 
@@ -60,68 +62,86 @@ dev = qml.device("default.qubit", wires=2)
 @qml.qnode(dev, interface="autograd")
 def qnn_circuit(angles, weights):
     """
-    Same structure as inference QNN:
+    Same structure as inference QNN, evaluated for a whole mini-batch:
+    angles has shape (B, 2) and PennyLane broadcasts the circuit over B.
 
       - encode angles as RY rotations
       - CZ entanglement
       - trainable RY layer
     """
-    qml.RY(angles[0], wires=0)
-    qml.RY(angles[1], wires=1)
+    qml.RY(angles[:, 0], wires=0)
+    qml.RY(angles[:, 1], wires=1)
     qml.CZ(wires=[0, 1])
     qml.RY(weights[0], wires=0)
     qml.RY(weights[1], wires=1)
     return qml.probs(wires=[0, 1])
 
 
-def qnn_forward(x, weights):
+def qnn_forward(A, weights):
     """
-    x: raw feature vector (shape (F,))
+    A: angle matrix (shape (B, 2))
     weights: trainable parameters (shape (2,))
-    returns: 3-prob vector (BUY, HOLD, SELL)
+    returns: (B, 3) probabilities (BUY, HOLD, SELL)
     """
-    angles = _prepare_angles(x, num_qubits=2)
-    probs4 = qnn_circuit(angles, weights)  # length-4
+    probs4 = qnn_circuit(A, weights)  # (B, 4)
 
     # map to 3 classes analytically, keeping it differentiable
-    p00, p01, p10, p11 = probs4[0], probs4[1], probs4[2], probs4[3]
-    p_buy = p00
-    p_hold = p01
-    p_sell = p10 + p11
+    p_buy = probs4[:, 0]
+    p_hold = probs4[:, 1]
+    p_sell = probs4[:, 2] + probs4[:, 3]
     total = p_buy + p_hold + p_sell
-    return np.stack([p_buy / total, p_hold / total, p_sell / total])
+    return np.stack([p_buy / total, p_hold / total, p_sell / total], axis=1)
 
 
 def cross_entropy(preds, targets):
     """
-    preds: (3,) probabilities
-    targets: (3,) one-hot
+    preds: (B, 3) probabilities
+    targets: (B, 3) one-hot
+    returns: (B,) per-sample losses
     """
     eps = 1e-8
     preds = np.clip(preds, eps, 1.0 - eps)
-    return -np.sum(targets * np.log(preds))
+    return -np.sum(targets * np.log(preds), axis=1)
 
 
-def cost(weights, X, Y):
+def cost(weights, A, Y):
     """
-    Average cross-entropy over a batch.
+    Average cross-entropy over a mini-batch, in one broadcast circuit call.
     """
-    losses = []
-    for x, y in zip(X, Y):
-        p = qnn_forward(x, weights)
-        losses.append(cross_entropy(p, y))
-    return np.mean(np.stack(losses))
+    return np.mean(cross_entropy(qnn_forward(A, weights), Y))
 
 
 
 # Training loop
 
+def run_epoch(weights, opt, A, Y, batch_size: int, rng):
+    """
+    One pass over (A, Y) in shuffled mini-batches. Returns the updated
+    weights and the mean cost over the epoch.
+    """
+    n = A.shape[0]
+    order = rng.permutation(n)
+    total_cost = 0.0
+
+    for start in range(0, n, batch_size):
+        batch = order[start : start + batch_size]
+        A_b, Y_b = A[batch], Y[batch]
+        weights, batch_cost = opt.step_and_cost(lambda w: cost(w, A_b, Y_b), weights)
+        total_cost += float(batch_cost) * len(batch)
+
+    return weights, total_cost / n
+
+
 def train_qnn(
     num_epochs: int = 15,
     stepsize: float = 0.2,
-    max_samples: int = 2000,
+    batch_size: int = 4096,
+    max_samples: Optional[int] = None,
+    seed: int = 42,
 ):
-    X, Y = load_training_data(max_samples=max_samples)
+    A, Y = load_training_data(max_samples=max_samples, seed=seed)
+    n = A.shape[0]
+    rng = onp.random.default_rng(seed)
 
     # Initialize weights small random
     weights = np.array([0.1, -0.1], requires_grad=True)
@@ -129,8 +149,13 @@ def train_qnn(
     opt = qml.GradientDescentOptimizer(stepsize=stepsize)
 
     for epoch in range(num_epochs):
-        weights, current_cost = opt.step_and_cost(lambda w: cost(w, X, Y), weights)
-        print(f"Epoch {epoch+1}/{num_epochs} - cost: {current_cost:.4f}")
+        t0 = time.time()
+        weights, epoch_cost = run_epoch(weights, opt, A, Y, batch_size, rng)
+        elapsed = time.time() - t0
+        print(
+            f"Epoch {epoch+1}/{num_epochs} - cost: {epoch_cost:.4f} "
+            f"- {n / elapsed:,.0f} samples/sec"
+        )
 
     # Convert to plain numpy and save
     final_weights = onp.array(weights, dtype=float)
@@ -140,11 +165,30 @@ def train_qnn(
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the PennyLane QNN.")
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--stepsize", type=float, default=0.2)
+    parser.add_argument(
+        "--max-samples",
+        type=int,
+        default=None,
+        help="Random subsample size (default: the full dataset)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
     root = Path(__file__).resolve().parents[0]
     print(f"Running quantum QNN training from {root}")
 
     t0 = time.time()
-    train_qnn()
+    train_qnn(
+        num_epochs=args.epochs,
+        stepsize=args.stepsize,
+        batch_size=args.batch_size,
+        max_samples=args.max_samples,
+        seed=args.seed,
+    )
     t_qnn = time.time() - t0
     print(f"[Timing] Quantum QNN training time: {t_qnn:.3f} seconds")
 